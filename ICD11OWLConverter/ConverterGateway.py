@@ -28,35 +28,170 @@
 # OF THE POSSIBILITY OF SUCH DAMAGE.
 
 import socket
+import time
+from collections import deque, Counter
+from contextlib import contextmanager
+from itertools import islice, chain
+from queue import Queue, Empty
+from threading import Lock, Thread
+from concurrent.futures import ThreadPoolExecutor
 from py4j.java_gateway import JavaGateway, GatewayClient, Py4JNetworkError
+from py4j.java_collections import ListConverter
+from py4j.protocol import Py4JError, Py4JJavaError
+
+
+def chunks(entries, chunksize):
+    """ Split an iterable into lists of at most chunksize elements
+    :param entries: iterable to split
+    :param chunksize: maximum number of elements per chunk
+    """
+    entries = iter(entries)
+    chunk = list(islice(entries, chunksize))
+    while chunk:
+        yield chunk
+        chunk = list(islice(entries, chunksize))
+
+
+class RetryPolicy(object):
+    def __init__(self, retries=1, backoff=0.1, multiplier=2.0, maxbackoff=5.0):
+        """ Number of times a failed gateway call is retried and how long to wait before each retry
+
+        @param retries: number of retries after the first attempt
+        @param backoff: seconds to wait before the first retry
+        @param multiplier: factor the wait grows by on every subsequent retry
+        @param maxbackoff: maximum number of seconds to wait
+        """
+        self.retries = int(retries)
+        self.backoff = float(backoff)
+        self.multiplier = float(multiplier)
+        self.maxbackoff = float(maxbackoff)
+
+    def delays(self):
+        """ Return the wait before each retry """
+        return [min(self.backoff * self.multiplier ** i, self.maxbackoff) for i in range(self.retries)]
+
+
+class CircuitBreaker(object):
+    def __init__(self, failure_threshold=3, probe_interval=5.0):
+        """ Fail fast while the gateway is known to be down.  The circuit opens after failure_threshold consecutive
+        failed calls.  While it is open, calls are rejected without touching the network and a background thread
+        probes the gateway every probe_interval seconds, closing the circuit when the probe succeeds.
+
+        @param failure_threshold: number of consecutive failures that opens the circuit
+        @param probe_interval: seconds between probes while the circuit is open
+        """
+        self.failure_threshold = int(failure_threshold)
+        self.probe_interval = float(probe_interval)
+        self.failures = 0
+        self.is_open = False
+        self._lock = Lock()
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.is_open = False
+
+    def record_failure(self, probe):
+        """ Record a failed call, opening the circuit if the threshold is reached
+        :param probe: function that returns True when the gateway is usable again
+        """
+        with self._lock:
+            self.failures += 1
+            if self.is_open or self.failures < self.failure_threshold:
+                return
+            self.is_open = True
+        print("Converter gateway circuit open -- probing every %s seconds" % self.probe_interval)
+        Thread(target=self._probe, args=(probe,), daemon=True).start()
+
+    def _probe(self, probe):
+        while self.is_open:
+            time.sleep(self.probe_interval)
+            if probe():
+                print("Converter gateway circuit closed")
+                self.record_success()
+
+
+# Failures that mean the gateway itself can't be reached
+network_errors = (Py4JNetworkError, socket.error)
 
 
 def gwfunction(func):
-    """ Function wrapper that handles making sure the connection is live and active
+    """ Function wrapper that handles making sure the connection is live and active.  Calls that fail because the
+    gateway can't be reached are retried according to the gateway's retry policy and count towards its circuit breaker,
+    and calls are rejected (returning None) while the circuit is open.  An exception raised on the Java side, such as a
+    malformed expression, is returned to the caller as None.
     :param func: Function to invoke when gateway is connected
     """
-    def wrapped_f(self, *args, **kwargs):
-        if self.gatewayconnected():
+    def invoke(self, *args, **kwargs):
+        if self.breaker.is_open:
+            self.count('rejections')
+            return None
+        delays = iter(self.retry_policy.delays())
+        while True:
             try:
-                return func(self, *args, **kwargs)
-            except Exception as e:
+                if self.gatewayconnected():
+                    rval = func(self, *args, **kwargs)
+                    self.breaker.record_success()
+                    return rval
+                error = None
+            except Py4JJavaError as e:
+                # The Java side is up and rejected the expression itself
+                print(e)
+                self.breaker.record_success()
+                return None
+            except network_errors as e:
                 print(e)
-                self.reconnect()
-                return func(self, *args, **kwargs)
+                error = e
+            delay = next(delays, None)
+            if delay is None:
+                self.breaker.record_failure(self.probe)
+                if error is not None:
+                    raise error
+                return None
+            self.count('retries')
+            time.sleep(delay)
+            self.count('reconnects')
+            self.reconnect()
+
+    def wrapped_f(self, *args, **kwargs):
+        if not self.stats:
+            return invoke(self, *args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return invoke(self, *args, **kwargs)
+        finally:
+            self.stats.record_call(func.__name__.strip('_'), time.perf_counter() - start)
     return wrapped_f
 
 
 class SCTConverterGateway(object):
-    def __init__(self, port=25321):
+    def __init__(self, port=25321, stats=None, retry_policy=None, breaker=None, ntriples=False):
         """ Construct a new SNOMED CT Converter/classifier gateway.  This uses the py4j gateway to connect to a java server.
 
         @param port: py4j gateway port (default: 25321)
+        @param stats: RunStats that records the latency of the gateway calls
+        @param retry_policy: RetryPolicy for failed calls (default: one immediate retry)
+        @param breaker: CircuitBreaker, which can be shared by gateways to the same server
+        @param ntriples: ask for the translations as N-Triples (cgparsent / cgparsemanynt), falling back to turtle if
+        the gateway doesn't have the N-Triples entry points
         """
+        self.stats = stats
+        self.retry_policy = retry_policy or RetryPolicy(retries=1, backoff=0)
+        self.breaker = breaker or CircuitBreaker()
+        self.counters = Counter()
         self._gwPort = int(port)
         self._parser = None
         self._gateway = None
+        self._batchparse = True
+        self._ntparse = ntriples
         self.reconnect()
 
+    def count(self, name):
+        """ Increment one of the reconnects, retries or rejections counters """
+        self.counters[name] += 1
+        if self.stats:
+            self.stats.count('gateway ' + name)
+
     def reconnect(self):
         """ (Re)establish the gateway connection
         @return: True if connection was established
@@ -71,6 +206,33 @@ class SCTConverterGateway(object):
             return False
         return True
 
+    def ping(self):
+        """ Check that the gateway connection is still usable
+        @return: True if the Java side answered
+        """
+        if self._gateway is None:
+            return False
+        try:
+            self._gateway.jvm.System.currentTimeMillis()
+        except (socket.error, Py4JError):
+            return False
+        return True
+
+    def probe(self):
+        """ Check the gateway over a connection of its own, leaving this one alone as it may be in use by another
+        thread.  Used by the circuit breaker while the circuit is open.
+        @return: True if the gateway is usable
+        """
+        try:
+            gateway = JavaGateway(GatewayClient(port=self._gwPort))
+            try:
+                gateway.jvm.System.currentTimeMillis()
+            finally:
+                gateway.close()
+        except (socket.error, Py4JError):
+            return False
+        return True
+
     def gatewayconnected(self, reconnect=True):
         """ Determine whether the gateway is connected
         @param reconnect: True means try to reconnect if not connected
@@ -86,5 +248,237 @@ class SCTConverterGateway(object):
         :param cgstring: string to be interpreted
         :return:  OWL equivalent or None if an error
         """
+        if self._ntparse:
+            try:
+                rval = self._parser.cgparsent(subj, primitive, cgstring)
+                return str(rval) if rval else None
+            except (Py4JNetworkError, Py4JJavaError):
+                raise
+            except Py4JError:
+                # The Java side doesn't have the N-Triples entry point
+                self._ntparse = False
         rval = self._parser.cgparse(subj, primitive, cgstring)
-        return str(rval) if rval else None
\ No newline at end of file
+        return str(rval) if rval else None
+
+    @gwfunction
+    def parser_version(self):
+        """ Return the version of the Java parser behind the gateway
+        :return: version string or None if the gateway doesn't report one
+        """
+        try:
+            rval = self._parser.version()
+        except Py4JNetworkError:
+            raise
+        except Py4JError:
+            return None
+        return str(rval) if rval else None
+
+    def parse_many(self, entries, chunksize=100):
+        """ Parse a sequence of compositional grammar strings, sending up to chunksize of them to the gateway in a
+        single call.  Falls back to one call per expression if the gateway has no batch entry point.
+        :param entries: iterable of (subj, primitive, cgstring) tuples
+        :param chunksize: number of expressions to send per call
+        :return: iterator over the OWL equivalents (None for errors) in the same order as entries
+        """
+        for chunk in chunks(entries, chunksize):
+            rslts = self._parse_chunk(chunk) if self._batchparse else None
+            if rslts is None:
+                rslts = [self.parse(*e) for e in chunk]
+            for rslt in rslts:
+                yield rslt
+
+    @gwfunction
+    def _parse_chunk(self, chunk):
+        """ Send a chunk of expressions to the gateway batch entry point
+        :param chunk: list of (subj, primitive, cgstring) tuples
+        :return: list of OWL equivalents or None if the chunk has to be parsed one expression at a time
+        """
+        client = self._gateway._gateway_client
+        subjs, primitives, cgstrings = zip(*chunk)
+        try:
+            parsemany = self._parser.cgparsemanynt if self._ntparse else self._parser.cgparsemany
+            rval = parsemany(ListConverter().convert([str(s) for s in subjs], client),
+                             ListConverter().convert([bool(p) for p in primitives], client),
+                             ListConverter().convert(list(cgstrings), client))
+        except Py4JNetworkError:
+            raise
+        except Py4JJavaError as e:
+            print(e)
+            return None
+        except Py4JError:
+            # The Java side doesn't have this batch entry point
+            if self._ntparse:
+                self._ntparse = False
+                return self._parse_chunk(chunk)
+            self._batchparse = False
+            return None
+        return [str(r) if r else None for r in rval]
+
+
+class GatewayPoolTimeout(Exception):
+    """ No gateway connection became available within the checkout timeout """
+    pass
+
+
+class BaseGatewayPool(object):
+    def __init__(self, size, stats=None):
+        """ A set of gateway connections that callers check out and return.  Subclasses decide where the connections
+        come from by implementing checkout and checkin.
+
+        @param size: maximum number of connections that can be checked out at the same time
+        @param stats: RunStats that records the latency of the gateway calls
+        """
+        self.size = size
+        self.stats = stats
+
+    @property
+    def counters(self):
+        """ Reconnect, retry and rejection counts summed over all of the connections """
+        return Counter()
+
+    def available(self):
+        """ Return True unless calls are being rejected """
+        return True
+
+    def checkout(self):
+        """ Take a gateway connection.  The caller must return it with checkin.
+        :return: gateway
+        """
+        raise NotImplementedError
+
+    def checkin(self, gw):
+        """ Return a gateway connection obtained from checkout """
+        raise NotImplementedError
+
+    @contextmanager
+    def connection(self):
+        """ Context manager that checks a gateway connection out for the duration of the with statement """
+        gw = self.checkout()
+        try:
+            yield gw
+        finally:
+            self.checkin(gw)
+
+    def parse(self, subj, primitive, cgstring):
+        """ Parse the supplied compositional grammar string using the next available gateway
+        :param subj: subject URI
+        :param primitive: if True, cgstring will be interpreted as subClassOf.  If False, equivalentClass
+        :param cgstring: string to be interpreted
+        :return:  OWL equivalent or None if an error
+        """
+        with self.connection() as gw:
+            return gw.parse(subj, primitive, cgstring)
+
+    def parser_version(self):
+        """ Return the version of the Java parser behind the gateways
+        :return: version string or None if the gateway doesn't report one
+        """
+        with self.connection() as gw:
+            return gw.parser_version()
+
+    def parse_many(self, entries, chunksize=100):
+        """ Parse a sequence of expressions, spreading chunks of chunksize expressions across the pool
+        :param entries: iterable of (subj, primitive, cgstring) tuples
+        :param chunksize: number of expressions to send per gateway call
+        :return: iterator over the parse results, in the same order as entries
+        """
+        entry_chunks = chunks(entries, chunksize)
+        first = next(entry_chunks, None)
+        second = next(entry_chunks, None)
+        if second is None:
+            # A single chunk doesn't need any threads
+            for rslt in self._parse_chunk(first) if first else []:
+                yield rslt
+            return
+        with ThreadPoolExecutor(self.size) as executor:
+            # Keep a bounded number of chunks in flight and return results as soon as they are available
+            pending = deque()
+            for chunk in chain([first, second], entry_chunks):
+                pending.append(executor.submit(self._parse_chunk, chunk))
+                while pending and (len(pending) > 2 * self.size or pending[0].done()):
+                    for rslt in pending.popleft().result():
+                        yield rslt
+            while pending:
+                for rslt in pending.popleft().result():
+                    yield rslt
+
+    def _parse_chunk(self, chunk):
+        with self.connection() as gw:
+            return list(gw.parse_many(chunk, len(chunk)))
+
+
+class SCTConverterGatewayPool(BaseGatewayPool):
+    def __init__(self, port=25321, size=1, stats=None, maxsize=None, timeout=None, health_interval=30,
+                 retry_policy=None, breaker=None, ntriples=False):
+        """ Construct a thread safe pool of SNOMED CT Converter gateways.  Each member of the pool holds its own py4j
+        connection.  The pool starts with size connections and grows on demand up to maxsize, so up to maxsize parse
+        requests can be in flight at the same time.
+
+        @param port: py4j gateway port (default: 25321)
+        @param size: number of gateway connections to open up front
+        @param stats: RunStats that records the latency of the gateway calls
+        @param maxsize: maximum number of gateway connections (default: size)
+        @param timeout: seconds to wait for a free connection before raising GatewayPoolTimeout.  None means forever
+        @param health_interval: connections that have been idle longer than this many seconds are checked before use
+        @param retry_policy: RetryPolicy for failed calls
+        @param breaker: CircuitBreaker shared by all of the connections (default: a new one)
+        @param ntriples: ask for the translations as N-Triples
+        """
+        self.minsize = max(int(size), 1)
+        super().__init__(max(int(maxsize) if maxsize else self.minsize, self.minsize), stats)
+        self.port = port
+        self.retry_policy = retry_policy
+        self.breaker = breaker or CircuitBreaker()
+        self.ntriples = ntriples
+        self._members = []
+        self.timeout = timeout
+        self.health_interval = health_interval
+        self._idle = Queue()
+        self._created = 0
+        self._lock = Lock()
+        for _ in range(self.minsize):
+            self._created += 1
+            self._idle.put((self._new_gateway(), time.time()))
+
+    def _new_gateway(self):
+        gw = SCTConverterGateway(self.port, self.stats, self.retry_policy, self.breaker, self.ntriples)
+        self._members.append(gw)
+        return gw
+
+    @property
+    def counters(self):
+        """ Reconnect, retry and rejection counts summed over all of the connections """
+        return sum((gw.counters for gw in list(self._members)), Counter())
+
+    def available(self):
+        """ Return True unless the circuit breaker is rejecting calls """
+        return not self.breaker.is_open
+
+    def checkout(self):
+        """ Take a gateway connection out of the pool, opening a new one if all are busy and the pool is below its
+        maximum size.  The caller must return it with checkin.
+        :return: gateway
+        """
+        try:
+            gw, last_used = self._idle.get_nowait()
+        except Empty:
+            with self._lock:
+                grow = self._created < self.size
+                if grow:
+                    self._created += 1
+            if grow:
+                return self._new_gateway()
+            try:
+                gw, last_used = self._idle.get(timeout=self.timeout)
+            except Empty:
+                raise GatewayPoolTimeout("No converter gateway available after %s seconds" % self.timeout)
+        if time.time() - last_used > self.health_interval and not gw.ping():
+            gw.count('reconnects')
+            gw.reconnect()
+        return gw
+
+    def checkin(self, gw):
+        """ Return a gateway connection to the pool
+        :param gw: gateway obtained from checkout
+        """
+        self._idle.put((gw, time.time()))
@@ -28,14 +28,20 @@
 # OF THE POSSIBILITY OF SUCH DAMAGE.
 import csv
 import sys
-import argparse
 import re
-from rdflib import Graph, URIRef, RDF, RDFS, OWL, Literal
+from collections import defaultdict
+from rdflib import Graph, URIRef, RDF, RDFS, OWL, Literal, BNode
 from io import StringIO
+from concurrent.futures import ProcessPoolExecutor
 
 from namespaces import namespaces, ICDCG, WHO, SCTCG
-from ConverterGateway import SCTConverterGateway
+from ConverterGateway import SCTConverterGateway, chunks
+from checkpoint import Checkpoint
+from ntriples import load_ntriples
+from graphstore import GraphStore
+from cli import cardio_parser
 from ontology_defs import cg_ontology
+from runstats import RunStats
 
 
 
@@ -51,9 +57,15 @@ single_concept_re = re.compile(r'\s*\d+\s*\|[^|]+\|\s*$')
 # The SCTConverter builds an illegal base expression.  This fixes this
 owlbasere = re.compile(r'(^@base <.*)#>', flags=re.MULTILINE)
 
+# Number of rows handed to a worker process at a time when --jobs is used without --checkpoint
+default_chunksize = 1000
 
-def init_graph():
-    g = Graph()
+# Gateway of a worker process
+worker_gw = None
+
+
+def init_graph(g=None):
+    g = Graph() if g is None else g
     list(g.bind(ns, uri) for ns, uri in namespaces.items())
     list(g.add(t) for t in cg_ontology)
     return g
@@ -65,6 +77,141 @@ def rem_sct_labels(g):
             g.remove((s, RDFS.label, o))
 
 
+def read_rows(tsvfile):
+    """ Read the rows of a cardio TSV file
+    :param tsvfile: open TSV file
+    :return: iterator over (row, who entity, (subject, primitive, expression)) tuples
+    """
+    for row in csv.DictReader(tsvfile, delimiter='\t'):
+        who_entity = row['icd11'].split(str(WHO))[1]
+        subj = URIRef(str(ICDCG if row['maptype'] == post_coordinated else SCTCG) + who_entity)
+        primitive = bool(single_concept_re.match(row['expression']))
+        yield row, who_entity, (subj, primitive, row['expression'])
+
+
+def convert_rows(gw, rows, stats):
+    """ Convert a list of rows
+    :param gw: parser gateway
+    :param rows: list of tuples returned by read_rows
+    :param stats: RunStats to record the outcomes in
+    :return: graph holding the translations and labels, list of map triples
+    """
+    g = Graph()
+    map_triples = []
+    for (row, who_entity, (subj, _, _)), ttlresult in zip(rows, gw.parse_many([entry for _, _, entry in rows])):
+        if ttlresult:
+            with stats.stage('load results'):
+                if load_ntriples(ttlresult, g) is None:
+                    g.parse(StringIO(owlbasere.sub(r'\1>', ttlresult)), format='n3')
+                g.add( (subj, RDFS.label, Literal('ICDCG  ' + row['icdrubric'])))
+                map_triples.append((URIRef(str(WHO) + who_entity), OWL.equivalentClass, subj))
+            stats.count('converted')
+        else:
+            print("Conversion failure: " + str(row))
+            stats.count('failed')
+    return g, map_triples
+
+
+def init_worker(port, ntriples=False):
+    """ Open the gateway connection of a worker process """
+    global worker_gw
+    worker_gw = SCTConverterGateway(port or 25321, RunStats(), ntriples=ntriples)
+
+
+def convert_rows_worker(rows):
+    """ Convert a list of rows in a worker process
+    :param rows: list of tuples returned by read_rows
+    :return: converted triples, map triples, gateway latencies and counters
+    """
+    stats = worker_gw.stats = RunStats()
+    g, map_triples = convert_rows(worker_gw, rows, stats)
+    return list(g), map_triples, stats.latencies, stats.counts
+
+
+def rename_bnodes(triples):
+    """ Load triples from a worker process into a graph, giving their blank nodes new identifiers.  Worker processes
+    are forked with the same blank node id generator state, so their identifiers can collide.
+    :param triples: triples to load
+    :return: graph
+    """
+    bnodes = defaultdict(BNode)
+    g = Graph()
+    for t in triples:
+        g.add(tuple(bnodes[n] if isinstance(n, BNode) else n for n in t))
+    return g
+
+
+def convert_chunks(gw, rows, chunksize, stats, jobs=1, port=None, ntriples=False):
+    """ Convert rows in chunks, either with gw or, if jobs is more than 1, in a pool of worker processes with a
+    gateway connection each
+    :param gw: parser gateway (not used with more than one job)
+    :param rows: list of tuples returned by read_rows
+    :param chunksize: number of rows per chunk
+    :param stats: RunStats to record the outcomes in
+    :param jobs: number of worker processes
+    :param port: gateway port of the worker processes
+    :param ntriples: ask the gateways of the worker processes for N-Triples
+    :return: iterator over (number of rows, converted graph, map triples) in input order
+    """
+    row_chunks = list(chunks(rows, chunksize))
+    if jobs <= 1:
+        for chunk in row_chunks:
+            yield (len(chunk), ) + convert_rows(gw, chunk, stats)
+        return
+    with ProcessPoolExecutor(jobs, initializer=init_worker, initargs=(port, ntriples)) as executor:
+        for chunk, (triples, map_triples, latencies, counts) in zip(row_chunks,
+                                                                    executor.map(convert_rows_worker, row_chunks)):
+            stats.merge(latencies, counts)
+            with stats.stage('load results'):
+                g = rename_bnodes(triples)
+            yield len(chunk), g, map_triples
+
+
+def convert_tsv(opts, gw, stats, graphs):
+    """ Convert the input file of a cardio_expressions_to_owl run
+    :param opts: command line options
+    :param gw: parser gateway (None with more than one job)
+    :param stats: RunStats to record the stage timings in
+    :param graphs: GraphStore to create the output graphs in
+    """
+    cg_graph = init_graph(graphs.graph('cg'))
+    with stats.stage('read input'):
+        map_graph = graphs.graph('map').parse(opts.mapfile, format='n3') if opts.mapfile else None
+    checkpoint = Checkpoint(opts.outfile, opts.infile) if opts.checkpoint or opts.resume else None
+    done = 0
+    if checkpoint:
+        if opts.resume and checkpoint.exists():
+            with stats.stage('read input'):
+                done = checkpoint.resume(cg_graph, map_graph)
+            print("Resuming after row %d" % done)
+        else:
+            checkpoint.start()
+    with open(opts.infile) as tsvfile:
+        with stats.stage('read input'):
+            rows = list(read_rows(tsvfile))[done:]
+
+        with stats.stage('convert'):
+            chunksize = opts.checkpoint or (default_chunksize if opts.jobs > 1 else max(len(rows), 1))
+            for nrows, g, map_triples in convert_chunks(gw, rows, chunksize, stats, opts.jobs, opts.port,
+                                                        opts.ntriples):
+                cg_graph += g
+                if map_graph:
+                    list(map_graph.add(t) for t in map_triples)
+                if checkpoint:
+                    with stats.stage('checkpoint'):
+                        checkpoint.save(nrows, g, map_triples if map_graph else ())
+
+        with stats.stage('serialize'):
+            rem_sct_labels(cg_graph)
+            cg_graph.serialize(opts.outfile, format="n3")
+            print("OWL saved to %s" % opts.outfile)
+            if map_graph:
+                map_graph.serialize(opts.mapfile + 'upd.ttl', format="n3")
+                print("Map saved to %s" % opts.mapfile + 'upd.ttl')
+    if checkpoint:
+        checkpoint.remove()
+
+
 def main(args):
     """ Convert a TSV file with the following columns:
     * icd11 - the URI of the ICD 11 resource
@@ -72,40 +219,22 @@ def main(args):
     * expression - a compositional grammar expression that fully or partially defines the ICD 11 resource
     * maptype - "A" means the definition belongs to WHO, "E" means it belongs to IHTSDO (and should be added to SNOMED CT)
     """
-    optparser = argparse.ArgumentParser(description="Convert cardio raw expressions into OWL")
-    optparser.add_argument('infile', help="Input tab separated value file file")
-    optparser.add_argument('-f', '--outputformat', help="File format", default="n3")
-    optparser.add_argument('-p', '--port', help="SCT Converter gateway port", type=int)
-    optparser.add_argument('-o', '--outfile', help="Output file name", required=True)
-    optparser.add_argument('-m', '--mapfile', help="Map file name")
-
-    opts = optparser.parse_args(args)
-
-    gw = SCTConverterGateway(opts.port) if opts.port else SCTConverterGateway()
-    cg_graph = init_graph()
-    map_graph = Graph().parse(opts.mapfile, format='n3') if opts.mapfile else None
-    with open(opts.infile) as tsvfile:
-        reader = csv.DictReader(tsvfile, delimiter='\t')
-        for row in reader:
-            who_entity = row['icd11'].split(str(WHO))[1]
-            subj = URIRef(str(ICDCG if row['maptype'] == post_coordinated else SCTCG) + who_entity)
-            primitive = bool(single_concept_re.match(row['expression']))
-            ttlresult = gw.parse(subj, primitive, row['expression'])
-            if ttlresult:
-                cg_graph.parse(StringIO(owlbasere.sub(r'\1>', ttlresult)), format='n3')
-                cg_graph.add( (subj, RDFS.label, Literal('ICDCG  ' + row['icdrubric'])))
-                if map_graph:
-                    owlc = URIRef(str(WHO) + who_entity)
-                    map_graph.add( (owlc, OWL.equivalentClass, subj))
-            else:
-                print("Conversion failure: " + str(row))
-
-        rem_sct_labels(cg_graph)
-        cg_graph.serialize(opts.outfile, format="n3")
-        print("OWL saved to %s" % opts.outfile)
-        if map_graph:
-            map_graph.serialize(opts.mapfile + 'upd.ttl', format="n3")
-            print("Map saved to %s" % opts.mapfile + 'upd.ttl')
+    run(cardio_parser().parse_args(args))
+
+
+def run(opts):
+    """ Convert a cardio TSV file, using the options parsed by cli.cardio_parser """
+    stats = RunStats()
+    if opts.jobs > 1:
+        gw = None
+    else:
+        gw = SCTConverterGateway(opts.port or 25321, stats, ntriples=opts.ntriples)
+    with GraphStore(opts.store, opts.storepath) as graphs:
+        convert_tsv(opts, gw, stats, graphs)
+    if opts.profile:
+        stats.print_summary()
+    if opts.stats_json:
+        stats.write_json(opts.stats_json)
 
 
 if __name__ == '__main__':
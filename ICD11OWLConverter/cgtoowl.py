@@ -27,14 +27,27 @@
 # OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
 # OF THE POSSIBILITY OF SUCH DAMAGE.
 
+import os
 import sys
-import argparse
 import re
 import io
-from rdflib import Graph, URIRef, ConjunctiveGraph
+from itertools import tee
+from contextlib import nullcontext
+from queue import Queue
+from concurrent.futures import ThreadPoolExecutor
+from rdflib import Graph, URIRef, RDF, RDFS, OWL
 
-from ConverterGateway import SCTConverterGateway
+from ConverterGateway import SCTConverterGateway, SCTConverterGatewayPool
+from gatewaymanager import GatewayManager
 from namespaces import namespaces
+from prefixes import PrefixShortener
+from translationcache import TranslationCache
+from manifest import ConversionManifest, manifest_path
+from owlstream import iter_comments
+from ntriples import NTriplesSink, load_ntriples
+from runstats import RunStats
+from graphstore import GraphStore
+from cli import cgtoowl_parser
 
 # This is the annotation property that carries the compositional grammar definition
 icdf_comments = URIRef(namespaces['icdf'] + "Description.entity.en.Comments")
@@ -43,26 +56,25 @@ icdf_comments = URIRef(namespaces['icdf'] + "Description.entity.en.Comments")
 cgre1 = re.compile(r'.*Expression (\(pre-coordinated\)|\(post_coordinated\))\s*(.*?)http(s?)://.*$')
 cgre2 = re.compile(r'.*Expression (\(pre-coordinated\)|\(post_coordinated\))\s*(.*)')
 
-# Expressions of lines to remove for remove sctid
-remove_list = [re.compile(r'^<' + namespaces['sctid'] + r'\d+> rdfs:label .*\.'),
-               re.compile(r'^<' + namespaces['sctid'] + r'\d+> a owl:Class \.$'),
-               re.compile(r'^<' + namespaces['sctid'] + r'\d+> a owl:ObjectProperty \.$')]
+# SCT identifiers and the (predicate, object) pairs of the SCT declarations to remove for remove sctid
+sctid_re = re.compile(re.escape(str(namespaces['sctid'])) + r'\d+$')
+sct_declarations = [(RDFS.label, None), (RDF.type, OWL.Class), (RDF.type, OWL.ObjectProperty)]
+
+# Serialization formats that shorturi applies to
+shorturi_formats = ['turtle', 'n3']
 
 # The SCTConverter builds an illegal base expression.  This fixes this
 owlbasere = re.compile(r'(^@base <.*)#>', flags=re.MULTILINE)
 
+prefix_shortener = PrefixShortener(namespaces)
+
 
 def fix_prefixes(owltext):
     """ Change the prefixes in a text file to the local namespace form
     :param owltext: text to change
     :return: text with prefixes mapped
     """
-    # This could be simplified if we could figure out how to get negative look-aheads to work...
-    def fix_prefix(l):
-        for k, v in namespaces.items():
-            l = re.sub('<' + str(v) + r'(.*?)>', k + r':\1', l, flags=re.DOTALL)
-        return l
-    return '\n'.join([l if l.startswith('@prefix') else fix_prefix(l) for l in owltext.split('\n')])
+    return prefix_shortener.shorten(owltext)
 
 def add_namespaces(g):
     list(g.bind(k, v) for k, v in namespaces.items())
@@ -81,7 +93,7 @@ def map_namespace(subj):
     return subj
 
 
-def parse_and_load(gw, subj, primitive, cgexpr, g):
+def parse_and_load(gw, subj, primitive, cgexpr, g, cache=None):
     """ Parse the conceptual grammar expression for the supplied subject and, if successful, add
     it to graph g.
     :param gw: parser gateway
@@ -89,70 +101,264 @@ def parse_and_load(gw, subj, primitive, cgexpr, g):
     :param primitive: true means subClassOf, false means equivalentClass
     :param cgexpr: expression to parse
     :param g: graph to add the result to
+    :param cache: translation cache to check before invoking the gateway
+    :return: true means success, false error
+    """
+    ttlresult = cache.parse(gw, subj, primitive, cgexpr) if cache else gw.parse(subj, primitive, cgexpr)
+    return load_result(ttlresult, g)
+
+
+def load_result(ttlresult, g):
+    """ Add the result of a gateway parse to graph g
+    :param ttlresult: N-Triples or turtle returned by the gateway.  None means the parse failed
+    :param g: graph to add the result to
     :return: true means success, false error
     """
-    ttlresult = gw.parse(subj, primitive, cgexpr)
-    if ttlresult:
+    if ttlresult and load_ntriples(ttlresult, g) is None:
         ttlresult = owlbasere.sub(r'\1>', ttlresult)
         g.parse(io.StringIO(ttlresult), format='n3')
     return bool(ttlresult)
 
+
+def extract_expression(desc):
+    """ Extract the compositional grammar expression from an ICD-11 comment
+    :param desc: text of the comment
+    :return: expression or None if the comment doesn't carry one
+    """
+    if cgre1.search(desc):
+        return cgre1.sub(r'\2', desc)
+    elif cgre2.search(desc):
+        return cgre2.sub(r'\2', desc)
+    return None
+
+
+def expression_entries(comments, primitive, stats=None):
+    """ Extract the compositional grammar expressions from a sequence of ICD-11 comments
+    :param comments: iterable of (subject, comment) tuples
+    :param primitive: true means subClassOf, false means equivalentClass
+    :param stats: RunStats to count the comments without expressions in
+    :return: iterator over (subject, primitive, expression) tuples for the comments that carry an expression
+    """
+    for subj, desc in comments:
+        cgexpr = extract_expression(desc)
+        if cgexpr:
+            yield subj, primitive, cgexpr
+        else:
+            print("No conversion available for %s (%s)" % (subj, desc), file=sys.stderr)
+            if stats:
+                stats.count('noexpression')
+
+
+def is_sct_declaration(triple):
+    """ Determine whether triple is the label or a class or object property declaration of an SCT identifier
+    :param triple: triple to test
+    :return: True if it is one of the SCT declarations
+    """
+    s, p, o = triple
+    return isinstance(s, URIRef) and any(p == p_ and (o_ is None or o == o_) for p_, o_ in sct_declarations) and \
+        bool(sctid_re.match(str(s)))
+
+
+def remove_sct_declarations(g):
+    """ Remove the labels and class and object property declarations of SCT identifiers from graph g
+    :param g: graph to remove the declarations from
+    :return: g
+    """
+    for p, o in sct_declarations:
+        for t in list(g.triples((None, p, o))):
+            if is_sct_declaration(t):
+                g.remove(t)
+    return g
+
+
 def serialize_graph(g, format="turtle", removesctid=False, shorturi=False):
-    try:
-        target = g.serialize(format="turtle").decode('utf-8')
-    except Exception as e:
-        return None, (400, e)
+    """ Serialize graph g
+    :param g: graph to serialize.  Note that removesctid removes the SCT declarations from g itself
+    :param format: output format
+    :param removesctid: remove the SCT label and class declarations
+    :param shorturi: use the local namespace prefixes in place of full URIs (turtle and n3 only)
+    :return: serialized graph or None, (error code, error message)
+    """
     if removesctid:
-        target = ('\n'.join([l for l in target.split('\n') if not any(e.match(l) for e in remove_list)])).strip()
+        remove_sct_declarations(g)
     if shorturi:
-        target = fix_prefixes(target)
-    out_g = ConjunctiveGraph()
-    out_g.parse(io.StringIO(target), format="turtle")
+        add_namespaces(g)
     try:
-        target = out_g.serialize(format=format).decode('utf-8')
+        target = g.serialize(format=format).decode('utf-8')
     except Exception as e:
         return None, (400, e)
-    return target
+    # rdflib won't generate prefixed names for local names that start with a digit
+    if shorturi and format in shorturi_formats:
+        target = fix_prefixes(target)
+    # Line filtering used to strip the trailing newline -- keep the output identical
+    return target.strip() if removesctid else target
+
+
+def load_results(submitted, results, g, stats):
+    """ Add a sequence of gateway results to graph g
+    :param submitted: iterable of the (subj, primitive, expression) tuples that were sent to the gateway
+    :param results: iterable of the corresponding gateway results
+    :param g: graph to add the results to
+    :param stats: RunStats to record the outcomes in
+    """
+    for (subj, _, cgexpr), ttlresult in zip(submitted, results):
+        with stats.stage('load results'):
+            loaded = load_result(ttlresult, g)
+        stats.count('converted' if loaded else 'failed')
+        if not loaded:
+            print("Conversion error on %s (%s)" % (subj, cgexpr), file=sys.stderr)
+
+
+def translate(gw, entries, cache=None, manifest=None):
+    """ Translate a sequence of expressions
+    :param gw: parser gateway
+    :param entries: iterable of (subj, primitive, expression) tuples
+    :param cache: translation cache to check before invoking the gateway
+    :param manifest: ConversionManifest to reuse unchanged translations from and record the translations in
+    :return: iterator over the gateway results in the same order as entries
+    """
+    if manifest:
+        return manifest.parse_many(gw, entries, cache)
+    return cache.parse_many(gw, entries) if cache else gw.parse_many(entries)
+
+
+def convert_to_graph(gw, opts, cache=None, stats=None, manifest=None, graphs=None):
+    """ Add the translations of the compositional grammar expressions to the input graph and write the result
+    :param gw: parser gateway
+    :param opts: command line options
+    :param cache: translation cache to check before invoking the gateway
+    :param stats: RunStats to record the stage timings in
+    :param manifest: ConversionManifest to reuse unchanged translations from and record the translations in
+    :param graphs: GraphStore to create the graph in.  Default: memory
+    """
+    stats = stats or RunStats()
+    target_graph = add_namespaces(graphs.graph('target') if graphs else Graph())
+    if opts.stream:
+        # Load the input in the background while the expressions are scanned out of it and converted
+        def load_input():
+            with stats.stage('parse input'):
+                target_graph.parse(opts.owlfile)
+        loader = ThreadPoolExecutor(1)
+        loaded = loader.submit(load_input)
+        comments = iter_comments(opts.owlfile)
+    else:
+        with stats.stage('parse input'):
+            target_graph.parse(opts.owlfile)
+            comments = list(target_graph.subject_objects(icdf_comments))
+
+    # Results come back in the order the expressions were submitted, so the merge is deterministic
+    with stats.stage('convert'):
+        expressions, submitted = tee(expression_entries(comments, not bool(opts.fullydefined), stats))
+        results = translate(gw, expressions, cache, manifest)
+        if opts.stream:
+            results = list(results)
+            loaded.result()
+            loader.shutdown()
+        load_results(submitted, results, target_graph, stats)
+    with stats.stage('serialize'):
+        target = serialize_graph(target_graph, removesctid=opts.removesctid, shorturi=opts.shorturi)
+    with stats.stage('write'):
+        open(opts.out, 'w').write(target)
+
+
+def convert_to_ntriples(gw, owlfile, out, primitive, removesctid=False, cache=None, stats=None, manifest=None):
+    """ Copy the input file to out as N-Triples, adding the translations of the compositional grammar expressions
+    as they are returned by the gateway.  Neither the input nor the output is held in memory.
+    :param gw: parser gateway
+    :param owlfile: input OWL file
+    :param out: text file to write the N-Triples to
+    :param primitive: true means subClassOf, false means equivalentClass
+    :param removesctid: remove the SCT label and class declarations
+    :param cache: translation cache to check before invoking the gateway
+    :param stats: RunStats to record the stage timings in
+    :param manifest: ConversionManifest to reuse unchanged translations from and record the translations in
+    """
+    stats = stats or RunStats()
+    comments = Queue()
+    sink = NTriplesSink(out, exclude=is_sct_declaration if removesctid else None,
+                        listener=lambda t: comments.put((t[0], t[2])) if t[1] == icdf_comments else None)
+
+    def copy_input():
+        try:
+            with stats.stage('parse input'):
+                sink.parse(owlfile)
+        finally:
+            comments.put(None)
+
+    loader = ThreadPoolExecutor(1)
+    copied = loader.submit(copy_input)
+    with stats.stage('convert'):
+        expressions, submitted = tee(expression_entries(iter(comments.get, None), primitive, stats))
+        results = translate(gw, expressions, cache, manifest)
+        for (subj, _, cgexpr), ttlresult in zip(submitted, results):
+            fragment = Graph()
+            with stats.stage('load results'):
+                loaded = load_result(ttlresult, fragment)
+                for t in fragment:
+                    sink.write(t)
+            stats.count('converted' if loaded else 'failed')
+            if not loaded:
+                print("Conversion error on %s (%s)" % (subj, cgexpr), file=sys.stderr)
+        copied.result()
+        loader.shutdown()
 
 
 def main(args):
     """ Extract the Compositional Grammar expressions from an OWL file and convert them into an offical importable OWL
     file
     """
+    run(cgtoowl_parser().parse_args(args))
 
-    optparser = argparse.ArgumentParser(description="Generate OWL from Comments in an ICD-11 file")
-    optparser.add_argument('owlfile', help="Input OWL file")
-    optparser.add_argument('-f', '--fullydefined', help="Definitions are fully defined", action="store_true")
-    optparser.add_argument('-p', '--port', help="SCT Converter gateway port", type=int)
-    optparser.add_argument('-o', '--out', help="Output file", required=True)
-    optparser.add_argument('-s', '--shorturi', help="Shorten URI's for readability", action="store_true")
-    optparser.add_argument('-r', '--removesctid', help="Remove the SCT class declarations", action="store_true")
-
-    opts = optparser.parse_args(args)
-
-    gw = SCTConverterGateway(opts.port) if opts.port else SCTConverterGateway()
-
-    g = Graph()
-    target_graph = add_namespaces(Graph())
-    g.parse(opts.owlfile)
-    target_graph.parse(opts.owlfile)
-
-    # Iterate over the comments with the compositional expressions
-    for subj, desc in list(g.subject_objects(icdf_comments)):
-        if cgre1.search(desc):
-            cgexpr = cgre1.sub(r'\2', desc)
-        elif cgre2.search(desc):
-            cgexpr = cgre2.sub(r'\2', desc)
-        else:
-            cgexpr = None
 
-        if cgexpr:
-            if not parse_and_load(gw, subj, not bool(opts.fullydefined), cgexpr, target_graph):
-                print("Conversion error on %s (%s)" % (subj, cgexpr), file=sys.stderr)
-        else:
-            print("No conversion available for %s (%s)" % (subj, desc), file=sys.stderr)
-    target = serialize_graph(target_graph, removesctid=opts.removesctid, shorturi=opts.shorturi)
-    open(opts.out, 'w').write(target)
+def run(opts):
+    """ Convert the expressions in an OWL file, using the options parsed by cli.cgtoowl_parser """
+    stats = RunStats()
+    port = opts.port if opts.port else 25321
+    if opts.spawn:
+        gw = GatewayManager(port, opts.spawn, opts.workers, stats, jar=opts.jar, command=opts.spawn_command,
+                            ntriples=opts.ntriples)
+    elif opts.workers > 1:
+        gw = SCTConverterGatewayPool(port, opts.workers, stats, ntriples=opts.ntriples)
+    else:
+        gw = SCTConverterGateway(port, stats, ntriples=opts.ntriples)
+    try:
+        version = cache = None
+        if opts.cache or opts.incremental:
+            version = opts.cacheversion or gw.parser_version()
+            if not version:
+                raise SystemExit("Cannot determine the parser version -- use --cacheversion to stamp the "
+                                 "translation cache and manifest")
+            cache = TranslationCache(opts.cache, version) if opts.cache else None
+        if opts.incremental and not os.path.exists(manifest_path(opts.incremental)):
+            print("No manifest for %s -- converting everything" % opts.incremental, file=sys.stderr)
+        with ConversionManifest(manifest_path(opts.incremental), version, manifest_path(opts.out)) \
+                if opts.incremental else nullcontext() as manifest:
+            if opts.stream_nt:
+                with open(opts.out, 'w') as out:
+                    convert_to_ntriples(gw, opts.owlfile, out, not bool(opts.fullydefined), opts.removesctid, cache,
+                                        stats, manifest)
+            else:
+                with GraphStore(opts.store, opts.storepath) as graphs:
+                    convert_to_graph(gw, opts, cache, stats, manifest, graphs)
+    finally:
+        if opts.spawn:
+            gw.close()
+    if opts.incremental:
+        deleted = len(manifest.deleted())
+        print("Incremental: %d reused, %d reparsed, %d removed" % (manifest.reused, manifest.reparsed, deleted),
+              file=sys.stderr)
+        stats.count('reused', manifest.reused)
+        stats.count('reparsed', manifest.reparsed)
+        stats.count('removed', deleted)
+    if cache:
+        cache.close()
+        print("Translation cache: %d hits, %d misses" % (cache.hits, cache.misses), file=sys.stderr)
+        stats.count('cache hits', cache.hits)
+        stats.count('cache misses', cache.misses)
+    if opts.profile:
+        stats.print_summary()
+    if opts.stats_json:
+        stats.write_json(opts.stats_json)
 
 
 if __name__ == '__main__':
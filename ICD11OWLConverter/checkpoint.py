@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2014, Mayo Clinic
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+# Redistributions of source code must retain the above copyright notice, this
+# list of conditions and the following disclaimer.
+#
+#     Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#
+#     Neither the name of the <ORGANIZATION> nor the names of its contributors
+#     may be used to endorse or promote products derived from this software
+#     without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+# IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,
+# INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, 
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE
+# OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+# OF THE POSSIBILITY OF SUCH DAMAGE.
+import os
+import json
+
+from ntriples import nt_line
+
+
+class Checkpoint(object):
+    def __init__(self, outfile, infile):
+        """ Restart point of a long running conversion.  The triples produced so far are appended to N-Triples files
+        beside the output file, and a small JSON file records how many input rows they cover and how long the
+        N-Triples files were at that point.
+
+        @param outfile: name of the output file of the conversion
+        @param infile: name of the input file.  A checkpoint can only be resumed with the same input
+        """
+        self.path = outfile + '.ckpt'
+        self.ntpath = outfile + '.ckpt.nt'
+        self.mappath = outfile + '.ckpt.map.nt'
+        self.infile = os.path.abspath(infile)
+        self.rows = 0
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def start(self):
+        """ Discard any existing checkpoint """
+        self.rows = 0
+        for path in (self.ntpath, self.mappath):
+            open(path, 'w').close()
+        self._write_state()
+
+    def resume(self, g, map_graph=None):
+        """ Load the triples saved by the last checkpoint
+        :param g: graph to add the converted triples to
+        :param map_graph: graph to add the map triples to
+        :return: number of input rows the checkpoint covers
+        """
+        with open(self.path) as f:
+            state = json.load(f)
+        if state['infile'] != self.infile:
+            raise ValueError("Checkpoint %s was made for %s" % (self.path, state['infile']))
+        # Anything written after the last complete checkpoint is discarded
+        for path, size in ((self.ntpath, state['ntsize']), (self.mappath, state['mapsize'])):
+            with open(path, 'a') as f:
+                f.truncate(size)
+        g.parse(self.ntpath, format='nt')
+        if map_graph is not None:
+            map_graph.parse(self.mappath, format='nt')
+        self.rows = state['rows']
+        return self.rows
+
+    def save(self, rows, triples, map_triples=()):
+        """ Append the triples produced since the last checkpoint and record the number of rows they cover
+        :param rows: number of input rows converted since the last checkpoint
+        :param triples: converted triples
+        :param map_triples: map triples
+        """
+        for path, ts in ((self.ntpath, triples), (self.mappath, map_triples)):
+            with open(path, 'a', encoding='utf-8') as f:
+                f.writelines(nt_line(t) for t in ts)
+                f.flush()
+                os.fsync(f.fileno())
+        self.rows += rows
+        self._write_state()
+
+    def _write_state(self):
+        state = dict(infile=self.infile, rows=self.rows,
+                     ntsize=os.path.getsize(self.ntpath), mapsize=os.path.getsize(self.mappath))
+        with open(self.path + '.tmp', 'w') as f:
+            json.dump(state, f)
+        os.replace(self.path + '.tmp', self.path)
+
+    def remove(self):
+        """ Remove the checkpoint files once the conversion is complete """
+        for path in (self.path, self.ntpath, self.mappath):
+            if os.path.exists(path):
+                os.remove(path)
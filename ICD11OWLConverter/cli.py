@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2014, Mayo Clinic
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+# Redistributions of source code must retain the above copyright notice, this
+# list of conditions and the following disclaimer.
+#
+#     Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#
+#     Neither the name of the <ORGANIZATION> nor the names of its contributors
+#     may be used to endorse or promote products derived from this software
+#     without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+# IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,
+# INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, 
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE
+# OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+# OF THE POSSIBILITY OF SUCH DAMAGE.
+""" Argument parsers and console script entry points for the batch tools.
+
+The entry points parse the command line before they import the tool, so --help and argument errors don't wait for
+rdflib, py4j and the converter modules to load.  Nothing in this module may import them.
+"""
+import os
+import sys
+import argparse
+
+# The tools use top level imports of their sibling modules
+tooldir = os.path.dirname(os.path.abspath(__file__))
+if tooldir not in sys.path:
+    sys.path.append(tooldir)
+
+store_names = ['memory', 'sqlite', 'sleepycat']
+default_jar = os.path.join(os.path.dirname(tooldir), 'javalib', 'SCTConverter.jar')
+default_command = 'java -jar {jar} {port}'
+
+
+def add_store_arguments(optparser):
+    optparser.add_argument('--store', help="Graph store (default: memory)", choices=store_names, default='memory')
+    optparser.add_argument('--storepath', help="Directory for the disk based graph stores (default: a temporary "
+                                               "directory)")
+
+
+def add_stats_arguments(optparser):
+    optparser.add_argument('--profile', help="Print stage timings and gateway statistics", action="store_true")
+    optparser.add_argument('--stats-json', help="Write stage timings and gateway statistics to a JSON file")
+
+
+def cgtoowl_parser():
+    optparser = argparse.ArgumentParser(description="Generate OWL from Comments in an ICD-11 file")
+    optparser.add_argument('owlfile', help="Input OWL file")
+    optparser.add_argument('-f', '--fullydefined', help="Definitions are fully defined", action="store_true")
+    optparser.add_argument('-p', '--port', help="SCT Converter gateway port", type=int)
+    optparser.add_argument('-o', '--out', help="Output file", required=True)
+    optparser.add_argument('-s', '--shorturi', help="Shorten URI's for readability", action="store_true")
+    optparser.add_argument('-r', '--removesctid', help="Remove the SCT class declarations", action="store_true")
+    optparser.add_argument('-w', '--workers', help="Number of concurrent gateway connections", type=int, default=1)
+    optparser.add_argument('--spawn', help="Launch this many gateway processes on consecutive ports starting at "
+                                           "--port, with --workers connections to each", type=int, default=0)
+    optparser.add_argument('--jar', help="Converter jar for --spawn (default: %s)" % default_jar, default=default_jar)
+    optparser.add_argument('--spawn-command', help="Command that starts a gateway for --spawn.  {jar} and {port} are "
+                                                   "replaced by --jar and the gateway port (default: %s)" %
+                                                   default_command, default=default_command)
+    optparser.add_argument('-n', '--ntriples', help="Ask the gateway for N-Triples instead of turtle (falls back to "
+                                                    "turtle if the gateway can't produce them)", action="store_true")
+    optparser.add_argument('-c', '--cache', help="Translation cache file")
+    optparser.add_argument('--cacheversion', help="Translation cache and manifest version stamp (default: the "
+                                                  "version reported by the gateway or, with --spawn, a hash of the "
+                                                  "jar).  Required if the gateway doesn't report a version")
+    optparser.add_argument('-i', '--incremental', metavar='PREVIOUS_OUTPUT',
+                           help="Only convert the entities that are new or changed since PREVIOUS_OUTPUT was "
+                                "produced, and write the manifest of this conversion to OUT.manifest")
+    optparser.add_argument('-S', '--stream', help="Stream the expressions out of the (RDF/XML) input while it is "
+                                                  "being loaded", action="store_true")
+    optparser.add_argument('--stream-nt', help="Write N-Triples as they are produced (ignores --shorturi)",
+                           action="store_true")
+    add_store_arguments(optparser)
+    add_stats_arguments(optparser)
+    return optparser
+
+
+def tagadder_parser():
+    optparser = argparse.ArgumentParser(description="Add a tag prefix to the labels in the supplied owl file")
+    optparser.add_argument('owlfile', help="Input OWL file")
+    optparser.add_argument('-f', '--format', help="File format", default="n3")
+    optparser.add_argument('-S', '--stream', help="Tag N-Triples or N-Quads input line by line",
+                           action="store_true")
+    add_store_arguments(optparser)
+    return optparser
+
+
+def isolate_equivalents_parser():
+    optparser = argparse.ArgumentParser(description="Split the input file into two output files -- one with pure ICD and a second with maps")
+    optparser.add_argument('owlfile', help="Input OWL file")
+    optparser.add_argument('-f', '--format', help="File format", default="n3")
+    optparser.add_argument('-of', '--outformat', help="Output file format(default is same as input)")
+    optparser.add_argument('-S', '--stream', help="Split N-Triples or N-Quads input line by line (output is in the "
+                                                  "input format)", action="store_true")
+    add_store_arguments(optparser)
+    return optparser
+
+
+def cardio_parser():
+    optparser = argparse.ArgumentParser(description="Convert cardio raw expressions into OWL")
+    optparser.add_argument('infile', help="Input tab separated value file file")
+    optparser.add_argument('-f', '--outputformat', help="File format", default="n3")
+    optparser.add_argument('-p', '--port', help="SCT Converter gateway port", type=int)
+    optparser.add_argument('-o', '--outfile', help="Output file name", required=True)
+    optparser.add_argument('-m', '--mapfile', help="Map file name")
+    optparser.add_argument('--checkpoint', help="Save the rows converted so far every CHECKPOINT rows", type=int)
+    optparser.add_argument('--resume', help="Resume from the last checkpoint of an interrupted run",
+                           action="store_true")
+    optparser.add_argument('-j', '--jobs', help="Number of worker processes, each with its own gateway connection",
+                           type=int, default=1)
+    optparser.add_argument('-n', '--ntriples', help="Ask the gateway for N-Triples instead of turtle (falls back to "
+                                                    "turtle if the gateway can't produce them)", action="store_true")
+    add_store_arguments(optparser)
+    add_stats_arguments(optparser)
+    return optparser
+
+
+def cgtoowl_main(args=None):
+    """ cgtoowl console script """
+    opts = cgtoowl_parser().parse_args(args)
+    from cgtoowl import run
+    run(opts)
+
+
+def tagadder_main(args=None):
+    """ tagadder console script """
+    opts = tagadder_parser().parse_args(args)
+    from tagadder import run
+    run(opts)
+
+
+def isolate_equivalents_main(args=None):
+    """ isolateEquivalents console script """
+    opts = isolate_equivalents_parser().parse_args(args)
+    from isolateEquivalents import run
+    run(opts)
+
+
+def cardio_main(args=None):
+    """ cardio_expressions_to_owl console script """
+    opts = cardio_parser().parse_args(args)
+    from cardio_expressions_to_owl import run
+    run(opts)
+
@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2014, Mayo Clinic
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+# Redistributions of source code must retain the above copyright notice, this
+# list of conditions and the following disclaimer.
+#
+#     Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#
+#     Neither the name of the <ORGANIZATION> nor the names of its contributors
+#     may be used to endorse or promote products derived from this software
+#     without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+# IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,
+# INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, 
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE
+# OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+# OF THE POSSIBILITY OF SUCH DAMAGE.
+import os
+import time
+import hashlib
+import shlex
+import socket
+import subprocess
+from collections import Counter
+from threading import Lock, Thread, Event
+from ConverterGateway import BaseGatewayPool, SCTConverterGatewayPool, CircuitBreaker
+from cli import default_jar, default_command
+
+
+def jar_version(jar):
+    """ Return a version stamp for a converter jar whose parser doesn't report a version
+    :param jar: converter jar file
+    :return: stamp derived from the content of the jar
+    """
+    sha = hashlib.sha1()
+    with open(jar, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            sha.update(block)
+    return 'jar-' + sha.hexdigest()
+
+
+class GatewayStartError(Exception):
+    """ A gateway process exited or didn't open its port within the startup timeout """
+    pass
+
+
+class GatewayProcess(object):
+    def __init__(self, port, command, startup_timeout=60):
+        """ A local Java gateway process
+
+        @param port: port the gateway listens on
+        @param command: command line that starts the gateway
+        @param startup_timeout: seconds to wait for the gateway to accept connections
+        """
+        self.port = port
+        self.command = command
+        self.startup_timeout = startup_timeout
+        self.restarts = 0
+        self._proc = None
+
+    def start(self):
+        """ Launch the process and wait until it accepts connections """
+        self._proc = subprocess.Popen(self.command, stdout=subprocess.DEVNULL)
+        deadline = time.time() + self.startup_timeout
+        while not self.listening():
+            if self._proc.poll() is not None:
+                raise GatewayStartError("Gateway on port %s exited with status %s" % (self.port, self._proc.returncode))
+            if time.time() > deadline:
+                self.stop()
+                raise GatewayStartError("Gateway on port %s didn't start within %s seconds" %
+                                        (self.port, self.startup_timeout))
+            time.sleep(0.5)
+
+    def stop(self):
+        """ Terminate the process """
+        if self._proc and self._proc.poll() is None:
+            self._proc.terminate()
+            try:
+                self._proc.wait(10)
+            except subprocess.TimeoutExpired:
+                self._proc.kill()
+                self._proc.wait()
+
+    def listening(self):
+        """ Return True if something accepts connections on the gateway port """
+        try:
+            socket.create_connection(('127.0.0.1', self.port), 1).close()
+            return True
+        except socket.error:
+            return False
+
+    def alive(self):
+        """ Return True if the process is running and accepting connections """
+        return self._proc is not None and self._proc.poll() is None and self.listening()
+
+
+class GatewayManager(BaseGatewayPool):
+    def __init__(self, port=25321, processes=1, size=1, stats=None, maxsize=None, timeout=None, health_interval=30,
+                 retry_policy=None, failure_threshold=3, probe_interval=5.0, jar=default_jar, command=None,
+                 startup_timeout=60, monitor_interval=5, ntriples=False):
+        """ Launch and supervise a set of local converter gateway processes on consecutive ports.  Each process is
+        served by its own connection pool, and every call goes to the process with the fewest calls in flight.  A
+        monitor thread restarts processes that have died or stopped accepting connections.
+
+        @param port: port of the first gateway process
+        @param processes: number of gateway processes
+        @param size: number of connections opened up front to each process
+        @param stats: RunStats that records the latency of the gateway calls
+        @param maxsize: maximum number of connections to each process (default: size)
+        @param timeout: seconds to wait for a free connection before raising GatewayPoolTimeout
+        @param health_interval: connections that have been idle longer than this many seconds are checked before use
+        @param retry_policy: RetryPolicy for failed calls
+        @param failure_threshold: consecutive failures that open the circuit breaker of a process
+        @param probe_interval: seconds between probes of a process whose circuit is open
+        @param jar: converter jar file
+        @param command: command that starts a gateway, as a string or a list of arguments.  '{jar}' and '{port}' are
+        replaced by the jar file and the port the gateway has to listen on.  Default: java -jar {jar} {port}
+        @param startup_timeout: seconds to wait for a gateway process to accept connections
+        @param monitor_interval: seconds between liveness checks
+        @param ntriples: ask for the translations as N-Triples
+        """
+        self.port = port
+        self.jar = jar
+        command = command or default_command
+        self.command = shlex.split(command) if isinstance(command, str) else list(command)
+        self.monitor_interval = monitor_interval
+        self._lock = Lock()
+        self._stopped = Event()
+        self._procs = []
+        self._pools = []
+        self._inflight = {}
+        self._checkedout = {}
+        try:
+            for p in range(int(port), int(port) + max(int(processes), 1)):
+                proc = GatewayProcess(p, [arg.format(jar=jar, port=p) for arg in self.command], startup_timeout)
+                proc.start()
+                self._procs.append(proc)
+                self._pools.append(SCTConverterGatewayPool(p, size, stats, maxsize, timeout, health_interval,
+                                                           retry_policy,
+                                                           CircuitBreaker(failure_threshold, probe_interval),
+                                                           ntriples))
+        except Exception:
+            self.close()
+            raise
+        super().__init__(sum(pool.size for pool in self._pools), stats)
+        self._monitor = Thread(target=self._watch, daemon=True)
+        self._monitor.start()
+
+    @property
+    def counters(self):
+        """ Reconnect, retry and rejection counts summed over all of the processes, plus the process restarts """
+        rval = sum((pool.counters for pool in self._pools), Counter())
+        rval['restarts'] = sum(proc.restarts for proc in self._procs)
+        return rval
+
+    def available(self):
+        """ Return True if at least one of the gateway processes is accepting calls """
+        return any(pool.available() for pool in self._pools)
+
+    def parser_version(self):
+        """ Return the version of the Java parser, or a stamp derived from the jar if the parser doesn't report one
+        :return: version string or None if the parser doesn't report one and the jar doesn't exist
+        """
+        return super().parser_version() or (jar_version(self.jar) if os.path.isfile(self.jar) else None)
+
+    def checkout(self):
+        """ Take a connection to the least loaded gateway process whose circuit is closed """
+        with self._lock:
+            candidates = [pool for pool in self._pools if pool.available()] or self._pools
+            pool = min(candidates, key=lambda pool: self._inflight.get(pool.port, 0))
+            self._inflight[pool.port] = self._inflight.get(pool.port, 0) + 1
+        try:
+            gw = pool.checkout()
+        except Exception:
+            with self._lock:
+                self._inflight[pool.port] -= 1
+            raise
+        with self._lock:
+            self._checkedout[id(gw)] = pool
+        return gw
+
+    def checkin(self, gw):
+        """ Return a connection to the pool of its gateway process """
+        with self._lock:
+            pool = self._checkedout.pop(id(gw))
+            self._inflight[pool.port] -= 1
+        pool.checkin(gw)
+
+    def _watch(self):
+        while not self._stopped.wait(self.monitor_interval):
+            for proc, pool in zip(self._procs, self._pools):
+                if self._stopped.is_set() or proc.alive():
+                    continue
+                print("Restarting the converter gateway on port %s" % proc.port)
+                proc.stop()
+                proc.restarts += 1
+                if self.stats:
+                    self.stats.count('gateway restarts')
+                try:
+                    proc.start()
+                except GatewayStartError as e:
+                    print(e)
+                    continue
+                # Connections to the old process reconnect on their next call
+                pool.breaker.record_success()
+
+    def close(self):
+        """ Stop the monitor and all of the gateway processes """
+        self._stopped.set()
+        for proc in self._procs:
+            proc.stop()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
@@ -0,0 +1,301 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2014, Mayo Clinic
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+# Redistributions of source code must retain the above copyright notice, this
+# list of conditions and the following disclaimer.
+#
+#     Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#
+#     Neither the name of the <ORGANIZATION> nor the names of its contributors
+#     may be used to endorse or promote products derived from this software
+#     without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+# IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,
+# INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, 
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE
+# OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+# OF THE POSSIBILITY OF SUCH DAMAGE.
+""" Backing stores for the large graphs built by the conversion tools.
+
+memory    - rdflib's default in-memory store
+sqlite    - SQLiteStore, a disk based store with interned terms that only needs the standard library
+sleepycat - rdflib's BerkeleyDB store (requires the bsddb3 package)
+"""
+import os
+import shutil
+import sqlite3
+import tempfile
+from rdflib import Graph, URIRef, BNode, Literal
+from rdflib.store import Store, VALID_STORE, NO_STORE
+
+from cli import store_names
+
+try:
+    from rdflib.plugins.sleepycat import has_bsddb
+except ImportError:
+    has_bsddb = False
+
+# Number of rows fetched from sqlite at a time
+fetch_size = 10000
+
+
+class SQLiteStore(Store):
+    """ An rdflib store that keeps the triples in a sqlite database.  Every term is stored once in a term table and
+    the triples are rows of three term ids, so memory use doesn't grow with the size of the graph.
+    The store holds a single graph.  It claims to be context and formula aware, which rdflib's n3 parser requires,
+    but the contexts are ignored.
+    """
+    context_aware = True
+    formula_aware = True
+    transaction_aware = False
+    graph_aware = False
+
+    def __init__(self, configuration=None, identifier=None):
+        self._db = None
+        self._ids = {}
+        Store.__init__(self, configuration, identifier)
+
+    def open(self, configuration, create=True):
+        """ Open the database
+        :param configuration: name of the sqlite database file
+        :param create: create the tables if they don't exist
+        """
+        if not create and not os.path.exists(configuration):
+            return NO_STORE
+        self._db = sqlite3.connect(configuration, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode = OFF")
+        self._db.execute("PRAGMA synchronous = OFF")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS terms (id INTEGER PRIMARY KEY, kind TEXT, value TEXT, lang TEXT, datatype TEXT,
+                                              UNIQUE (kind, value, lang, datatype));
+            CREATE TABLE IF NOT EXISTS triples (s INTEGER, p INTEGER, o INTEGER, PRIMARY KEY (s, p, o)) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS triples_pos ON triples (p, o);
+            CREATE INDEX IF NOT EXISTS triples_os ON triples (o, s);
+            CREATE TABLE IF NOT EXISTS namespaces (prefix TEXT PRIMARY KEY, uri TEXT);""")
+        return VALID_STORE
+
+    def close(self, commit_pending_transaction=False):
+        if self._db:
+            self._db.commit()
+            self._db.close()
+            self._db = None
+
+    def commit(self):
+        self._db.commit()
+
+    @staticmethod
+    def _key(term):
+        if isinstance(term, Literal):
+            return 'L', str(term), term.language or '', str(term.datatype or '')
+        return 'B' if isinstance(term, BNode) else 'U', str(term), '', ''
+
+    @staticmethod
+    def _term(kind, value, lang, datatype):
+        if kind == 'U':
+            return URIRef(value)
+        if kind == 'B':
+            return BNode(value)
+        return Literal(value, lang=lang or None, datatype=URIRef(datatype) if datatype else None)
+
+    def _id(self, term, create=False):
+        """ Return the id of a term, adding it to the term table if create is True
+        :return: id or None if the term isn't in the store
+        """
+        key = self._key(term)
+        tid = self._ids.get(key)
+        if tid is None:
+            row = self._db.execute("SELECT id FROM terms WHERE kind = ? AND value = ? AND lang = ? AND datatype = ?",
+                                   key).fetchone()
+            if row:
+                tid = row[0]
+            elif create:
+                tid = self._db.execute("INSERT INTO terms (kind, value, lang, datatype) VALUES (?, ?, ?, ?)",
+                                       key).lastrowid
+            else:
+                return None
+            # Only the most recently used ids are kept in memory
+            if len(self._ids) > 100000:
+                self._ids.clear()
+            self._ids[key] = tid
+        return tid
+
+    def add(self, triple, context, quoted=False):
+        Store.add(self, triple, context, quoted)
+        self._db.execute("INSERT OR IGNORE INTO triples VALUES (?, ?, ?)",
+                         tuple(self._id(t, create=True) for t in triple))
+
+    def addN(self, quads):
+        for s, p, o, c in quads:
+            self.add((s, p, o), c)
+
+    def _where(self, triple):
+        """ Return the where clause and parameters that select triple pattern, or None if nothing can match """
+        clauses = []
+        params = []
+        for col, term in zip(('t.s', 't.p', 't.o'), triple):
+            if term is not None:
+                tid = self._id(term)
+                if tid is None:
+                    return None
+                clauses.append(col + ' = ?')
+                params.append(tid)
+        return (' WHERE ' + ' AND '.join(clauses) if clauses else ''), params
+
+    def remove(self, triple, context=None):
+        Store.remove(self, triple, context)
+        where = self._where(triple)
+        if where is not None:
+            self._db.execute("DELETE FROM triples AS t" + where[0] if where[0] else "DELETE FROM triples", where[1])
+
+    def triples(self, triple, context=None):
+        where = self._where(triple)
+        if where is None:
+            return
+        cursor = self._db.cursor()
+        cursor.execute("SELECT s.kind, s.value, s.lang, s.datatype, p.kind, p.value, p.lang, p.datatype, "
+                       "o.kind, o.value, o.lang, o.datatype FROM triples t "
+                       "JOIN terms s ON s.id = t.s JOIN terms p ON p.id = t.p JOIN terms o ON o.id = t.o" + where[0],
+                       where[1])
+        # Read the matches ahead in blocks, so callers can update the graph while iterating
+        rows = cursor.fetchmany(fetch_size)
+        while rows:
+            for r in rows:
+                yield (self._term(*r[0:4]), self._term(*r[4:8]), self._term(*r[8:12])), iter(())
+            rows = cursor.fetchmany(fetch_size)
+
+    def contexts(self, triple=None):
+        return iter(())
+
+    def __len__(self, context=None):
+        return self._db.execute("SELECT COUNT(*) FROM triples").fetchone()[0]
+
+    def bind(self, prefix, namespace):
+        self._db.execute("DELETE FROM namespaces WHERE uri = ?", (str(namespace),))
+        self._db.execute("INSERT OR REPLACE INTO namespaces VALUES (?, ?)", (prefix, str(namespace)))
+
+    def namespace(self, prefix):
+        row = self._db.execute("SELECT uri FROM namespaces WHERE prefix = ?", (prefix,)).fetchone()
+        return URIRef(row[0]) if row else None
+
+    def prefix(self, namespace):
+        row = self._db.execute("SELECT prefix FROM namespaces WHERE uri = ?", (str(namespace),)).fetchone()
+        return row[0] if row else None
+
+    def namespaces(self):
+        for prefix, uri in self._db.execute("SELECT prefix, uri FROM namespaces").fetchall():
+            yield prefix, URIRef(uri)
+
+
+class RoutingStore(Store):
+    """ A write only rdflib store that hands every triple that is added to it to a function instead of storing it.
+    Parsing into a graph backed by a RoutingStore streams the input through the function.  It claims to be context
+    and formula aware so that the n3 parser can be used with it.
+    """
+    context_aware = True
+    formula_aware = True
+
+    def __init__(self, route):
+        """
+        @param route: function that is invoked with every triple
+        """
+        Store.__init__(self)
+        self.route = route
+        self._prefixes = {}
+        self._namespaces = {}
+
+    def add(self, triple, context, quoted=False):
+        self.route(triple)
+
+    def addN(self, quads):
+        for s, p, o, c in quads:
+            self.route((s, p, o))
+
+    def remove(self, triple, context=None):
+        pass
+
+    def triples(self, triple, context=None):
+        return iter(())
+
+    def contexts(self, triple=None):
+        return iter(())
+
+    def __len__(self, context=None):
+        return 0
+
+    def bind(self, prefix, namespace):
+        self._prefixes[namespace] = prefix
+        self._namespaces[prefix] = namespace
+
+    def namespace(self, prefix):
+        return self._namespaces.get(prefix)
+
+    def prefix(self, namespace):
+        return self._prefixes.get(namespace)
+
+    def namespaces(self):
+        return iter(list(self._namespaces.items()))
+
+
+class GraphStore(object):
+    def __init__(self, store='memory', path=None):
+        """ Factory for the graphs of a conversion run
+
+        @param store: one of store_names
+        @param path: directory for the files of the disk based stores.  Default: a temporary directory that is
+        removed by close
+        """
+        if store not in store_names:
+            raise ValueError("Unknown store: %s" % store)
+        if store == 'sleepycat' and not has_bsddb:
+            raise ValueError("The sleepycat store requires the bsddb3 package")
+        self.store = store
+        self._tmpdir = tempfile.mkdtemp(prefix='icd11store') if store != 'memory' and not path else None
+        self.path = path or self._tmpdir
+        if self.path and not os.path.exists(self.path):
+            os.makedirs(self.path)
+        self._graphs = []
+
+    def graph(self, name):
+        """ Return a new, empty graph
+        :param name: name of the graph, which has to be unique within the run
+        :return: Graph
+        """
+        if self.store == 'memory':
+            return Graph()
+        if self.store == 'sqlite':
+            dbfile = os.path.join(self.path, name + '.sqlite')
+            if os.path.exists(dbfile):
+                os.remove(dbfile)
+            g = Graph(SQLiteStore(dbfile))
+        else:
+            dbdir = os.path.join(self.path, name + '.db')
+            shutil.rmtree(dbdir, ignore_errors=True)
+            g = Graph('Sleepycat')
+            g.open(dbdir, create=True)
+        self._graphs.append(g)
+        return g
+
+    def close(self):
+        """ Close the graphs and remove the temporary directory """
+        for g in self._graphs:
+            g.close()
+        self._graphs = []
+        if self._tmpdir:
+            shutil.rmtree(self._tmpdir, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
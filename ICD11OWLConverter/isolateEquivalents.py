@@ -28,53 +28,130 @@
 # OF THE POSSIBILITY OF SUCH DAMAGE.
 
 import sys
-import argparse
 from rdflib import Graph, OWL, RDFS, Literal
 
-from ICD11OWLConverter.namespaces import namespaces
+from namespaces import namespaces
 from ontology_defs import map_ontology
+from graphstore import GraphStore, RoutingStore
+from cli import isolate_equivalents_parser
+from prefixes import PrefixIndex
+from ntriples import nt_line, nt_term, nt_terms, nt_value
+
+# Formats that can be split line by line
+stream_formats = ['nt', 'nquads']
+
+# ICD entities and SNOMED CT concepts are recognized by the who and sctid namespaces that the converter itself uses
+ns_index = PrefixIndex({namespaces['who']: 'who', namespaces['sctid']: 'sct'})
+map_namespaces = {'who', 'sct'}
+
+equivalentClass_nt = nt_term(OWL.equivalentClass)
+label_nt = nt_term(RDFS.label)
+
+
+def is_map(subj, obj):
+    """ Determine whether an equivalence is a map between ICD and SNOMED CT
+    :param subj: subject URI string
+    :param obj: object URI string
+    :return: True if one is an ICD entity and the other a SNOMED CT concept
+    """
+    return {ns_index.lookup(subj), ns_index.lookup(obj)} == map_namespaces
+
+
+def icd_label(value):
+    """ Return the tagged form of an ICD label """
+    return Literal('ICD  ' + value)
+
+
+def split_triple(triple):
+    """ Classify a triple of the input file
+    :param triple: input triple
+    :return: (True if the triple belongs in the maps output, triple to write)
+    """
+    s, p, o = triple
+    if p == OWL.equivalentClass and is_map(str(s), str(o)):
+        return True, triple
+    if p == RDFS.label and ns_index.lookup(str(s)) == 'who':
+        return False, (s, p, icd_label(str(o)))
+    return False, triple
+
+
+def split_graph(owlfile, format, nomaps_g, map_g):
+    """ Parse the input file, adding every triple to either nomaps_g or map_g.  The input isn't loaded into a graph
+    of its own.
+    :param owlfile: input file
+    :param format: input format
+    :param nomaps_g: graph to receive the ICD declarations
+    :param map_g: graph to receive the maps
+    """
+    def route(triple):
+        maps, triple = split_triple(triple)
+        (map_g if maps else nomaps_g).add(triple)
+
+    source = Graph(RoutingStore(route))
+    source.parse(owlfile, format=format)
+    for prefix, ns in source.namespaces():
+        nomaps_g.bind(prefix, ns)
+        if prefix:
+            map_g.bind(prefix, ns)
+
+
+def split_ntriples(infile, nomaps, maps):
+    """ Split an N-Triples (or N-Quads) file line by line
+    :param infile: input text file
+    :param nomaps: text file to receive the ICD declarations
+    :param maps: text file to receive the maps
+    """
+    maps.writelines(nt_line(t) for t in map_ontology)
+    for line in infile:
+        terms = nt_terms(line)
+        if terms is None:
+            continue
+        s, p, o, g = terms
+        if p == equivalentClass_nt and is_map(nt_value(s), nt_value(o)):
+            maps.write(line)
+        elif p == label_nt and ns_index.lookup(nt_value(s)) == 'who':
+            nomaps.write(' '.join([s, p, nt_term(icd_label(nt_value(o)))] + ([g] if g else [])) + ' .\n')
+        else:
+            nomaps.write(line)
 
 
 def main(args):
     """ Create two files from the input file.  One with the ICD declarations and
     a second with the equivalent and subclass declarations
     """
-    optparser = argparse.ArgumentParser(description="Split the input file into two output files -- one with pure ICD and a second with maps")
-    optparser.add_argument('owlfile', help="Input OWL file")
-    optparser.add_argument('-f', '--format', help="File format", default="n3")
-    optparser.add_argument('-of', '--outformat', help="Output file format(default is same as input)")
+    run(isolate_equivalents_parser().parse_args(args))
+
 
-    opts = optparser.parse_args(args)
+def run(opts):
+    """ Split an OWL file, using the options parsed by cli.isolate_equivalents_parser """
     if not opts.outformat:
         opts.outformat = opts.format
 
-    g = Graph()
-    print("Reading " + opts.owlfile)
-    g.parse(opts.owlfile, format=opts.format)
-    map_g = Graph()
-    list(map_g.bind(ns[0], ns[1]) for ns in g.namespaces() if ns[0])
-    list(map_g.add(e) for e in map_ontology)
-
-    # Iterate over the assertions
-    strwho = str(namespaces['who'])
-    strsct = str(namespaces['sctid'])
-    for s, o in g[:OWL.equivalentClass]:
-        # TODO: find the official way of determining namespaces
-        if (str(s).startswith(strwho) and str(o).startswith(strsct)) or \
-                (str(s).startswith(strsct) and str(o).startswith(strwho)):
-            map_g.add((s, OWL.equivalentClass, o))
-            g.remove((s, OWL.equivalentClass, o))
-
-    whostr = str(namespaces['who'])
-    for s, o in list(g[:RDFS.label]):
-        if str(s).startswith(whostr):
-            g.add((s, RDFS.label, Literal('ICD  ' + str(o))))
-            g.remove((s, RDFS.label, o))
-
-    open(opts.owlfile + 'nomaps.ttl', 'wb').write(g.serialize(format=opts.outformat))
-    print(opts.owlfile + 'nomaps.ttl written')
-    open(opts.owlfile + 'maps.ttl', 'wb').write(map_g.serialize(format=opts.outformat))
-    print(opts.owlfile + 'maps.ttl written')
+    if opts.stream:
+        if opts.format not in stream_formats:
+            print("--stream requires one of the %s formats" % ', '.join(stream_formats), file=sys.stderr)
+            return
+        print("Reading " + opts.owlfile)
+        ext = '.' + opts.format
+        with open(opts.owlfile, encoding='utf-8') as infile, \
+                open(opts.owlfile + 'nomaps' + ext, 'w', encoding='utf-8') as nomaps, \
+                open(opts.owlfile + 'maps' + ext, 'w', encoding='utf-8') as maps:
+            split_ntriples(infile, nomaps, maps)
+        print(opts.owlfile + 'nomaps' + ext + ' written')
+        print(opts.owlfile + 'maps' + ext + ' written')
+        return
+
+    with GraphStore(opts.store, opts.storepath) as graphs:
+        g = graphs.graph('nomaps')
+        map_g = graphs.graph('maps')
+        list(map_g.add(e) for e in map_ontology)
+        print("Reading " + opts.owlfile)
+        split_graph(opts.owlfile, opts.format, g, map_g)
+
+        open(opts.owlfile + 'nomaps.ttl', 'wb').write(g.serialize(format=opts.outformat))
+        print(opts.owlfile + 'nomaps.ttl written')
+        open(opts.owlfile + 'maps.ttl', 'wb').write(map_g.serialize(format=opts.outformat))
+        print(opts.owlfile + 'maps.ttl written')
 
 
 if __name__ == '__main__':
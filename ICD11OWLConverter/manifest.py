@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2014, Mayo Clinic
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+# Redistributions of source code must retain the above copyright notice, this
+# list of conditions and the following disclaimer.
+#
+#     Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#
+#     Neither the name of the <ORGANIZATION> nor the names of its contributors
+#     may be used to endorse or promote products derived from this software
+#     without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+# IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,
+# INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, 
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE
+# OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+# OF THE POSSIBILITY OF SUCH DAMAGE.
+import os
+import json
+import hashlib
+
+from ConverterGateway import chunks
+from translationcache import normalize_expression
+
+manifest_suffix = '.manifest'
+
+
+def manifest_path(outfile):
+    """ Return the name of the manifest that is stored beside an output file """
+    return outfile + manifest_suffix
+
+
+class ConversionManifest(object):
+    def __init__(self, path=None, version=None, out=None):
+        """ Record of the expressions that went into a conversion and the translations that came out of it, so the
+        next conversion can reuse the translations of the entities whose expressions haven't changed.  The manifest
+        of the conversion is written to out as the translations are recorded, rather than held in memory.
+
+        @param path: manifest of the previous conversion.  None or a missing file means there is nothing to reuse
+        @param version: version stamp of the parser.  The previous translations are discarded if it differs from the
+        version recorded in the manifest.
+        @param out: file to write the manifest of this conversion to.  It only replaces an existing file when the
+        manifest is closed, so out may be the same file as path.
+        """
+        if not version:
+            raise ValueError("A manifest needs the version of the parser that produced the translations")
+        self.version = str(version)
+        self.previous = {}
+        self.subjects = set()
+        self.reused = 0
+        self.reparsed = 0
+        if path and os.path.exists(path):
+            with open(path) as f:
+                if json.loads(next(f, '{}')).get('version') == self.version:
+                    for line in f:
+                        subj, key, owl = json.loads(line)
+                        self.previous[(subj, key)] = owl
+        self.out = out
+        self._out = None
+        if out:
+            self._out = open(out + '.partial', 'w')
+            self._out.write(json.dumps(dict(version=self.version)) + '\n')
+
+    @staticmethod
+    def key(primitive, cgexpr):
+        """ Return the hash of a definition of an entity
+        :param primitive: True means subClassOf, False means equivalentClass
+        :param cgexpr: compositional grammar expression
+        :return: hash
+        """
+        return hashlib.sha1('\n'.join([str(bool(primitive)), normalize_expression(cgexpr)]).encode('utf-8')).hexdigest()
+
+    def get(self, subj, primitive, cgexpr):
+        """ Return the previous translation of this definition of subj, or None if subj didn't have it """
+        return self.previous.get((str(subj), self.key(primitive, cgexpr)))
+
+    def put(self, subj, primitive, cgexpr, owl):
+        self.subjects.add(str(subj))
+        if self._out:
+            self._out.write(json.dumps([str(subj), self.key(primitive, cgexpr), owl]) + '\n')
+
+    def deleted(self):
+        """ Return the subjects that were in the previous conversion but not in this one """
+        return sorted(set(subj for subj, _ in self.previous) - self.subjects)
+
+    def parse_many(self, gw, entries, cache=None, chunksize=1000):
+        """ Translate a sequence of expressions, sending only the new and changed ones to the gateway (or cache)
+        and recording all of the translations in the manifest.  Failed translations are not recorded.
+        :param gw: parser gateway
+        :param entries: iterable of (subj, primitive, cgexpr) tuples
+        :param cache: translation cache to check before invoking the gateway
+        :param chunksize: number of expressions to look up before calling the gateway
+        :return: iterator over the OWL equivalents (None for errors) in the same order as entries
+        """
+        for chunk in chunks(entries, chunksize):
+            rslts = [self.get(*e) for e in chunk]
+            changed = [e for e, r in zip(chunk, rslts) if r is None]
+            self.reused += len(chunk) - len(changed)
+            self.reparsed += len(changed)
+            parsed = iter(cache.parse_many(gw, changed) if cache else gw.parse_many(changed))
+            for e, rslt in zip(chunk, rslts):
+                if rslt is None:
+                    rslt = next(parsed)
+                if rslt:
+                    self.put(e[0], e[1], e[2], rslt)
+                yield rslt
+
+    def close(self):
+        """ Put the manifest of this conversion in place """
+        if self._out:
+            self._out.close()
+            os.replace(self._out.name, self.out)
+            self._out = None
+
+    def discard(self):
+        """ Remove the partially written manifest of a conversion that failed """
+        if self._out:
+            self._out.close()
+            os.remove(self._out.name)
+            self._out = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *_):
+        if exc_type:
+            self.discard()
+        else:
+            self.close()
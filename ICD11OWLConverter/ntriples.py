@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2014, Mayo Clinic
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+# Redistributions of source code must retain the above copyright notice, this
+# list of conditions and the following disclaimer.
+#
+#     Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#
+#     Neither the name of the <ORGANIZATION> nor the names of its contributors
+#     may be used to endorse or promote products derived from this software
+#     without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+# IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,
+# INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, 
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE
+# OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+# OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import re
+from collections import defaultdict
+from threading import Lock
+from rdflib import Graph, URIRef, BNode, Literal
+
+from graphstore import RoutingStore
+
+# One N-Triples (or N-Quads) statement per line: subject, predicate, object and an optional graph name
+_uri = r'<([^>]*)>'
+_bnode = r'_:([A-Za-z0-9_.-]+)'
+_literal = r'"((?:[^"\\]|\\.)*)"(?:@([A-Za-z]+(?:-[A-Za-z0-9]+)*)|\^\^<([^>]*)>)?'
+nt_statement_re = re.compile(r'\s*(?:{u}|{b})\s*{u}\s*(?:{u}|{b}|{l})\s*(?:{u}|{b})?\s*\.\s*$'
+                             .format(u=_uri, b=_bnode, l=_literal))
+# The same statement, keeping the N-Triples text of each term
+_term = r'(<[^>]*>|_:[A-Za-z0-9_.-]+)'
+nt_terms_re = re.compile(r'\s*{t}\s*(<[^>]*>)\s*(<[^>]*>|_:[A-Za-z0-9_.-]+|"(?:[^"\\]|\\.)*"'
+                         r'(?:@[A-Za-z]+(?:-[A-Za-z0-9]+)*|\^\^<[^>]*>)?)\s*{t}?\s*\.\s*$'.format(t=_term))
+nt_escape_re = re.compile(r'\\(?:u([0-9A-Fa-f]{4})|U([0-9A-Fa-f]{8})|(.))')
+nt_escapes = {'t': '\t', 'b': '\b', 'n': '\n', 'r': '\r', 'f': '\f', '"': '"', "'": "'", '\\': '\\'}
+
+
+def nt_term(term):
+    """ Return the N-Triples representation of an RDF term
+    :param term: URIRef, BNode or Literal
+    :return: N-Triples form
+    """
+    if isinstance(term, Literal):
+        rval = '"%s"' % str(term).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n').replace('\r', '\\r')
+        if term.language:
+            return rval + '@' + term.language
+        return rval + ('^^<%s>' % term.datatype if term.datatype else '')
+    return term.n3()
+
+
+def nt_line(triple):
+    """ Return the N-Triples (or N-Quads) line for a tuple of RDF terms
+    :param triple: (s, p, o) or (s, p, o, g)
+    :return: N-Triples line, including the terminating newline
+    """
+    return ' '.join(nt_term(t) for t in triple) + ' .\n'
+
+
+def nt_unescape(text):
+    """ Replace the escape sequences in an N-Triples string """
+    if '\\' not in text:
+        return text
+    return nt_escape_re.sub(lambda m: chr(int(m.group(1) or m.group(2), 16)) if m.group(3) is None
+                            else nt_escapes.get(m.group(3), m.group(3)), text)
+
+
+def nt_terms(line):
+    """ Split an N-Triples (or N-Quads) line into the N-Triples text of its terms
+    :param line: line to split
+    :return: (subject, predicate, object, graph name or None) or None if line is blank or a comment
+    :raises ValueError: if the line is not an N-Triples statement
+    """
+    m = nt_terms_re.match(line)
+    if not m:
+        if not line.strip() or line.lstrip().startswith('#'):
+            return None
+        raise ValueError("Not an N-Triples statement: %s" % line)
+    return m.groups()
+
+
+def nt_value(text):
+    """ Return the string value (str() of the rdflib term) of the N-Triples text of a term """
+    if text.startswith('"'):
+        return nt_unescape(text[1:text.rindex('"')])
+    return text[1:-1] if text.startswith('<') else text[2:]
+
+
+def iter_ntriples(text, bnodes=None):
+    """ Parse N-Triples (or N-Quads, dropping the graph names) text
+    :param text: text to parse
+    :param bnodes: map from blank node labels to BNodes.  Default: every label gets a new BNode
+    :return: iterator over the triples in text
+    :raises ValueError: if a line is not an N-Triples statement
+    """
+    bnodes = defaultdict(BNode) if bnodes is None else bnodes
+    for line in text.splitlines():
+        m = nt_statement_re.match(line)
+        if not m:
+            if not line.strip() or line.lstrip().startswith('#'):
+                continue
+            raise ValueError("Not an N-Triples statement: %s" % line)
+        su, sb, p, ou, ob, ol, lang, dt = m.groups()[:8]
+        if ou is not None:
+            o = URIRef(ou)
+        elif ob is not None:
+            o = bnodes[ob]
+        else:
+            o = Literal(nt_unescape(ol), lang=lang, datatype=URIRef(dt) if dt else None)
+        yield URIRef(su) if su is not None else bnodes[sb], URIRef(p), o
+
+
+def load_ntriples(text, g):
+    """ Add the triples in an N-Triples fragment to graph g.  The blank nodes of the fragment are new to g.  Nothing
+    is added if the text isn't N-Triples.
+    :param text: N-Triples text
+    :param g: graph to add the triples to
+    :return: number of triples added or None if text isn't N-Triples
+    """
+    try:
+        triples = list(iter_ntriples(text))
+    except ValueError:
+        return None
+    context = getattr(g, 'default_context', g)
+    g.addN((s, p, o, context) for s, p, o in triples)
+    return len(triples)
+
+
+class NTriplesSink(Graph):
+    def __init__(self, out, exclude=None, listener=None):
+        """ A graph that writes the triples that are added to it to a file as N-Triples instead of storing them.
+        This allows an rdflib parser to stream its input straight through to the output.  The triples are taken from
+        the store, so this works for the parsers that add them to another graph on the same store, such as n3.
+
+        @param out: text file to write to
+        @param exclude: function that returns True for triples that should not be written
+        @param listener: function that is invoked for every triple that is added
+        """
+        Graph.__init__(self, RoutingStore(self._added))
+        self._out = out
+        self._exclude = exclude
+        self._listener = listener
+        self._lock = Lock()
+
+    def _added(self, triple):
+        if self._listener:
+            self._listener(triple)
+        self.write(triple)
+
+    def write(self, triple):
+        """ Write triple to the output file unless it is excluded.  Can be invoked from multiple threads.
+        :param triple: triple to write
+        """
+        if not (self._exclude and self._exclude(triple)):
+            with self._lock:
+                self._out.write(nt_line(triple))
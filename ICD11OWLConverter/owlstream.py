@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2014, Mayo Clinic
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+# Redistributions of source code must retain the above copyright notice, this
+# list of conditions and the following disclaimer.
+#
+#     Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#
+#     Neither the name of the <ORGANIZATION> nor the names of its contributors
+#     may be used to endorse or promote products derived from this software
+#     without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+# IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,
+# INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, 
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE
+# OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+# OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import os
+from urllib.parse import urljoin
+from urllib.request import pathname2url
+from xml.etree import ElementTree
+from rdflib import URIRef
+
+from namespaces import namespaces
+
+RDFNS = "http://www.w3.org/1999/02/22-rdf-syntax-ns#"
+rdf_about = '{%s}about' % RDFNS
+rdf_id = '{%s}ID' % RDFNS
+xml_base = '{http://www.w3.org/XML/1998/namespace}base'
+
+# Element tag of the annotation property that carries the compositional grammar definition
+icdf_comments_tag = '{%s}%s' % (namespaces['icdf'], "Description.entity.en.Comments")
+
+
+def document_uri(owlfile):
+    """ Return the URI of a file, which is the base URI of its content if it doesn't declare one """
+    return urljoin('file:', pathname2url(os.path.abspath(owlfile)))
+
+
+def iter_comments(owlfile, tag=icdf_comments_tag):
+    """ Incrementally scan an RDF/XML file for the elements with the supplied tag, without building a graph.  The
+    subjects are resolved against the xml:base in effect at each element.
+    :param owlfile: name of the RDF/XML file to scan
+    :param tag: ElementTree tag of the property element to extract
+    :return: iterator over (subject, text) tuples, in document order
+    :raises ValueError: if an element with the tag belongs to a blank node, which can only be converted by loading the
+    whole graph
+    """
+    subjects = []
+    bases = [document_uri(owlfile)]
+    root = None
+    for event, elem in ElementTree.iterparse(owlfile, events=('start', 'end')):
+        if event == 'start':
+            if root is None:
+                root = elem
+            base = elem.get(xml_base)
+            bases.append(urljoin(bases[-1], base) if base is not None else bases[-1])
+            about = elem.get(rdf_about)
+            if about is None and elem.get(rdf_id) is not None:
+                about = '#' + elem.get(rdf_id)
+            subjects.append(URIRef(urljoin(bases[-1], about)) if about is not None else None)
+        else:
+            subjects.pop()
+            bases.pop()
+            if elem.tag == tag and subjects:
+                if subjects[-1] is None:
+                    raise ValueError("%s: %s of a blank node can't be streamed -- convert without --stream" %
+                                     (owlfile, tag))
+                yield subjects[-1], elem.text or ''
+            if len(subjects) == 1:
+                # Top level description is complete -- discard it
+                root.clear()
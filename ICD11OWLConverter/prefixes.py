@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2014, Mayo Clinic
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+# Redistributions of source code must retain the above copyright notice, this
+# list of conditions and the following disclaimer.
+#
+#     Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#
+#     Neither the name of the <ORGANIZATION> nor the names of its contributors
+#     may be used to endorse or promote products derived from this software
+#     without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+# IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,
+# INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, 
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE
+# OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+# OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import re
+
+from namespaces import namespaces
+
+
+class PrefixIndex(object):
+    def __init__(self, prefixmap):
+        """ Construct an index that finds the longest of a set of prefixes that a string starts with, using a single
+        precompiled expression rather than a startswith test per prefix.
+
+        @param prefixmap: map from prefix (e.g. a namespace URI) to the value to return for it
+        """
+        self.values = {str(k): v for k, v in prefixmap.items()}
+        self._re = re.compile('|'.join(re.escape(p) for p in sorted(self.values, key=len, reverse=True)))
+
+    def lookup(self, text, default=None):
+        """ Return the value of the longest prefix of text
+        :param text: string to look up
+        :param default: value to return if none of the prefixes match
+        :return: value or default
+        """
+        m = self._re.match(text) if self.values else None
+        return self.values[m.group(0)] if m else default
+
+
+class PrefixShortener(object):
+    def __init__(self, nsmap=None):
+        """ Construct a text rewriter that replaces full URIs (<http://...>) with their prefixed form (prefix:name).
+        All of the namespaces are matched by a single precompiled expression.
+
+        @param nsmap: map from prefix to namespace URI.  Default: namespaces.namespaces
+        """
+        self.prefixes = {}
+        for k, v in (nsmap if nsmap is not None else namespaces).items():
+            self.prefixes.setdefault(str(v), k)
+        # Longest namespace first, so that a namespace nested in another one is matched correctly.  @prefix
+        # declarations are matched as a whole and left alone.
+        alternatives = '|'.join(re.escape(ns) for ns in sorted(self.prefixes, key=len, reverse=True))
+        self._re = re.compile(r'^@prefix[^\n]*|<(' + alternatives + r')([^>\n]*)>', flags=re.MULTILINE)
+
+    def _replace(self, match):
+        ns = match.group(1)
+        return self.prefixes[ns] + ':' + match.group(2) if ns is not None else match.group(0)
+
+    def shorten(self, owltext):
+        """ Change the URIs in a turtle text to the prefixed form
+        :param owltext: text to change
+        :return: text with prefixes mapped
+        """
+        return self._re.sub(self._replace, owltext) if self.prefixes else owltext
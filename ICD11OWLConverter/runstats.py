@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2014, Mayo Clinic
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+# Redistributions of source code must retain the above copyright notice, this
+# list of conditions and the following disclaimer.
+#
+#     Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#
+#     Neither the name of the <ORGANIZATION> nor the names of its contributors
+#     may be used to endorse or promote products derived from this software
+#     without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+# IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,
+# INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, 
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE
+# OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+# OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import sys
+import json
+import math
+import time
+from collections import OrderedDict, Counter
+from contextlib import contextmanager
+from threading import Lock
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+def percentile(values, pct):
+    """ Return the pct'th percentile of a sorted list using the nearest rank method
+    :param values: sorted list of values
+    :param pct: percentile (0-100)
+    """
+    if not values:
+        return None
+    return values[min(len(values) - 1, max(0, math.ceil(pct / 100.0 * len(values)) - 1))]
+
+
+def peak_rss_kb():
+    """ Return the peak resident set size of this process in kilobytes, or None if it isn't available """
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if sys.platform == 'darwin' else rss
+
+
+class RunStats(object):
+    def __init__(self):
+        """ Per-stage wall times, gateway call latencies and event counters for a conversion run """
+        self.stages = OrderedDict()
+        self.latencies = {}
+        self.counts = Counter()
+        self._start = time.perf_counter()
+        self._lock = Lock()
+
+    @contextmanager
+    def stage(self, name):
+        """ Accumulate the wall time spent in the body of the with statement under name """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.stages[name] = self.stages.get(name, 0.0) + elapsed
+
+    def record_call(self, name, elapsed):
+        """ Record the latency of a gateway call.  Can be invoked from multiple threads.
+        :param name: type of call
+        :param elapsed: latency in seconds
+        """
+        with self._lock:
+            self.latencies.setdefault(name, []).append(elapsed)
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counts[name] += n
+
+    def merge(self, latencies, counts):
+        """ Add the gateway latencies and counters recorded by another process
+        :param latencies: the latencies of the other RunStats
+        :param counts: the counts of the other RunStats
+        """
+        with self._lock:
+            for name, values in latencies.items():
+                self.latencies.setdefault(name, []).extend(values)
+            self.counts.update(counts)
+
+    def report(self, expressions_counter='converted'):
+        """ Return the statistics as a JSON serializable dictionary
+        :param expressions_counter: name of the counter used to compute the expressions per second
+        """
+        wall_time = time.perf_counter() - self._start
+        calls = OrderedDict()
+        for name, latencies in sorted(self.latencies.items()):
+            latencies = sorted(latencies)
+            calls[name] = OrderedDict([('calls', len(latencies)),
+                                       ('total', sum(latencies)),
+                                       ('p50', percentile(latencies, 50)),
+                                       ('p95', percentile(latencies, 95)),
+                                       ('p99', percentile(latencies, 99)),
+                                       ('max', latencies[-1])])
+        return OrderedDict([('timestamp', time.strftime('%Y-%m-%dT%H:%M:%S')),
+                            ('wall_time', wall_time),
+                            ('stages', self.stages),
+                            ('gateway', calls),
+                            ('counts', OrderedDict(sorted(self.counts.items()))),
+                            ('expressions_per_second', self.counts[expressions_counter] / wall_time if wall_time else 0),
+                            ('peak_rss_kb', peak_rss_kb())])
+
+    def write_json(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.report(), f, indent=2)
+
+    def print_summary(self, file=sys.stderr):
+        report = self.report()
+        print("Wall time: %.3fs  (%.1f expressions/sec, peak RSS %s KB)" %
+              (report['wall_time'], report['expressions_per_second'], report['peak_rss_kb']), file=file)
+        for name, elapsed in report['stages'].items():
+            print("  %-20s %10.3fs" % (name, elapsed), file=file)
+        for name, c in report['gateway'].items():
+            print("  gateway %-12s %6d calls  p50 %.4fs  p95 %.4fs  p99 %.4fs" %
+                  (name, c['calls'], c['p50'], c['p95'], c['p99']), file=file)
+        for name, n in report['counts'].items():
+            print("  %-20s %10d" % (name, n), file=file)
@@ -49,6 +49,32 @@ return_map = {'txt': 'text/plain',
               'nt': 'text/plain',}
 
 
+class StreamedResponse(object):
+    """ Response body that is sent to the client piece by piece, as it is generated, rather than built in memory """
+    def __init__(self, chunks, content_type=None):
+        """
+        @param chunks: iterable of response text fragments
+        @param content_type: content type of the response.  Default: the type of the negotiated format
+        """
+        self.chunks = chunks
+        self.content_type = content_type
+
+    def __iter__(self):
+        return iter(self.chunks)
+
+
+def check_etag(etag):
+    """ Set the ETag header of the response and answer 304 (Not Modified) if the client already has it
+    :param etag: quoted entity tag of the response body
+    """
+    cherrypy.response.headers['ETag'] = etag
+    if_none_match = cherrypy.request.headers.get('If-None-Match')
+    if if_none_match:
+        tags = [e.strip() for e in if_none_match.split(',')]
+        if '*' in tags or etag in tags or 'W/' + etag in tags:
+            raise cherrypy.HTTPRedirect([], 304)
+
+
 def expose(arg1=None, arg2=None):
     """ Expose the wrapped function as a web service
     :param arg1: Either a function or the "self" parameter for a class method or a set of allowable methods
@@ -71,15 +97,19 @@ def expose(arg1=None, arg2=None):
             # class                      - assumed to have a toxml() function
             # tuple                      - tuple of (rval, (error code, error message))
             #                               rval is string or class as above
+            # StreamedResponse           - text fragments that are sent to the caller as they are generated
             rtn = func_(self, *args, format=format, **kwargs)
 
             rval, (err, msg) = rtn if isinstance(rtn, (list, tuple)) else (rtn, (500, 'Internal Server Error'))
             if not rval:
                 raise cherrypy.HTTPError(err, str(msg))
-            if rval.startswith(htmlHead):
+            if isinstance(rval, StreamedResponse):
+                cherrypy.response.stream = True
+            elif rval.startswith(htmlHead):
                 return rval
-            cherrypy.response.headers['Content-type'] = return_map.get(format, 'text/plain') + ';charset=UTF-8'
-            return rval
+            content_type = getattr(rval, 'content_type', None) or return_map.get(format, 'text/plain')
+            cherrypy.response.headers['Content-type'] = content_type + ';charset=UTF-8'
+            return iter(rval) if isinstance(rval, StreamedResponse) else rval
 
         return wrapped_f
 
@@ -46,6 +46,7 @@ class Resource():
 
 print("Connecting resources")
 resources = [Resource(r'/', SCTConverter, action='index'),
+             Resource(r'/parse/batch', SCTConverter, method='POST', action='batch'),
              Resource(r'/parse', SCTConverter, method='POST'),
              Resource(r'/parse', SCTConverter, method='GET'),
              ]
\ No newline at end of file
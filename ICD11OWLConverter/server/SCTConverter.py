@@ -27,67 +27,325 @@
 # OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
 # OF THE POSSIBILITY OF SUCH DAMAGE.
 import re
-import sys
-from os.path import join
-from rdflib import ConjunctiveGraph
-from rdflib.plugin import plugins
-from rdflib.serializer import Serializer
-from server.BaseNode import expose
-from ConverterGateway import SCTConverterGateway
-from cgtoowl import parse_and_load, serialize_graph, add_namespaces, map_namespace
+import json
+import hashlib
+from os.path import join, dirname, abspath
+from functools import lru_cache
+from threading import Lock, Thread
+import cherrypy
+from server.BaseNode import expose, check_etag, StreamedResponse
+from server.utils.listutils import listify
+from server.utils.batchrows import batch_readers
+from server.utils.lrucache import LRUCache
+from ConverterGateway import SCTConverterGatewayPool, GatewayPoolTimeout, RetryPolicy, CircuitBreaker
+from gatewaymanager import GatewayManager, default_jar, default_command
+
+# rdflib and the modules that use it (cgtoowl, ntriples) take most of the import time of the server.  They are
+# imported by load_converter when they are first needed, or by the warm up that runs once the server is listening.
 
 true_values = ['y', 'yes', 'true', '1', 'on', 'yup']
 false_values = ['n', 'no', 'false', '0', 'off', 'nope']
 
-htmldir = join(sys.path[0], 'static', 'html')
-htmltext = open(join(htmldir, 'icd11.html')).read()
+# /parse/batch result forms: a single merged graph or a list of per row results
+batch_results = ['merged', 'rows']
+conversion_error = "Unable to convert supplied expression"
+unavailable_error = "Converter gateway is unavailable"
+
+# Formats whose batch results are streamed to the client as each row is converted
+stream_formats = ['nt', 'nquads']
+
+htmldir = join(dirname(dirname(dirname(abspath(__file__)))), 'static', 'html')
+fmtbox = '<input type="radio" name="format" value="%s">%s</input>'
+
+# Seconds that browsers may reuse the landing page without revalidating it
+landing_max_age = 3600
+sample_subject = "who:12345"
+sample_expr = """18526009| Disorder of appendix (disorder) |+
+	302168000| Inflammation of large intestine (disorder) |+
+	64572001| Disease (disorder) |:
+	{ 116676008| Associated morphology (attribute) |=23583003| Inflammation (morphologic abnormality) |,
+	363698007| Finding site (attribute) |=66754008| Appendix structure (body structure) | }"""
+
+
+_load_lock = Lock()
 
-class formats():
-    fmtbox = '<input type="radio" name="format" value="%s">%s</input>'
 
+def load_converter():
+    """ Import rdflib and the converter modules that use it.  The imports are serialized, as rdflib fails to import in
+    two threads at once. """
+    with _load_lock:
+        import cgtoowl
+
+
+@lru_cache(maxsize=1)
+def serializer_formats():
+    """ Return the names of the rdflib serializers, resolved on the first call """
+    load_converter()
+    from rdflib.plugin import plugins
+    from rdflib.serializer import Serializer
+    return tuple(e.name for e in plugins(kind=Serializer) if '/' not in e.name)
+
+
+@lru_cache(maxsize=1)
+def landing_template():
+    """ Return the landing page template, read on the first call """
+    with open(join(htmldir, 'icd11.html')) as f:
+        return f.read()
+
+
+@lru_cache(maxsize=8)
+def landing_page(formats):
+    """ Render the landing page for a list of formats
+    :param formats: tuple of format names to offer
+    :return: page text, quoted entity tag
+    """
+    subject = sample_subject
+    expr = sample_expr
+    formats = '\n'.join([fmtbox % (e, e) for e in formats])
+    page = landing_template() % vars()
+    return page, '"%s"' % hashlib.sha1(page.encode('utf-8')).hexdigest()
 
-    def html_formats(self):
-        return '\n'.join([self.fmtbox % (e, e) for e in self._formats])
 
 class SCTConverter():
 
     def __init__(self):
-        self._parser = SCTConverterGateway()
-        self.formats = [e.name for e in plugins(kind=Serializer) if '/' not in e.name]
+        self._parser = None
+        self._cache = None
+        self._init_lock = Lock()
+        cherrypy.engine.subscribe('start', self.warm_up)
+
+    @property
+    def formats(self):
+        """ Names of the formats the results can be serialized in """
+        return serializer_formats()
 
     @staticmethod
-    def boolval(parm):
-        parm_ = str(parm).lower()
-        return True if parm_ in true_values else False if parm_ in false_values else None
+    def warm_up():
+        """ Load rdflib and the converter modules and render the landing page in the background, so that neither the
+        server startup nor the first request waits for them """
+        def load():
+            load_converter()
+            landing_page(serializer_formats())
+        Thread(target=load, daemon=True).start()
 
-    fmtbox = '<input type="radio" name="format" value="%s">%s</input>'
+    # The parser pool and the cache are created on first use, as the server configuration isn't loaded when the
+    # converter is constructed.
+    @property
+    def parser(self):
+        """ Pool of gateway connections shared by the request threads.  If gatewaypool.processes is set, the server
+        launches and supervises that many gateway processes itself. """
+        with self._init_lock:
+            if self._parser is None:
+                port = cherrypy.config.get('gatewaypool.port', 25321)
+                size = cherrypy.config.get('gatewaypool.minsize', 1)
+                poolopts = dict(
+                    maxsize=cherrypy.config.get('gatewaypool.maxsize', cherrypy.config.get('server.thread_pool', 10)),
+                    timeout=cherrypy.config.get('gatewaypool.timeout', 30),
+                    health_interval=cherrypy.config.get('gatewaypool.health_interval', 30),
+                    retry_policy=RetryPolicy(cherrypy.config.get('gatewaypool.retries', 1),
+                                             cherrypy.config.get('gatewaypool.backoff', 0.1)),
+                    ntriples=cherrypy.config.get('gatewaypool.ntriples', False))
+                failure_threshold = cherrypy.config.get('gatewaypool.failure_threshold', 3)
+                probe_interval = cherrypy.config.get('gatewaypool.probe_interval', 5)
+                processes = cherrypy.config.get('gatewaypool.processes', 0)
+                if processes:
+                    self._parser = GatewayManager(port, processes, size, failure_threshold=failure_threshold,
+                                                  probe_interval=probe_interval,
+                                                  jar=cherrypy.config.get('gatewaypool.jar', default_jar),
+                                                  command=cherrypy.config.get('gatewaypool.command', default_command),
+                                                  **poolopts)
+                    cherrypy.engine.subscribe('stop', self._parser.close)
+                else:
+                    self._parser = SCTConverterGatewayPool(port, size, breaker=CircuitBreaker(failure_threshold,
+                                                                                              probe_interval),
+                                                           **poolopts)
+        return self._parser
 
-    def html_formats(self):
-        return '\n'.join([self.fmtbox % (e, e) for e in self.formats])
+    @property
+    def cache(self):
+        """ Cache of serialized parse results """
+        with self._init_lock:
+            if self._cache is None:
+                self._cache = LRUCache(cherrypy.config.get('parsecache.size', 256),
+                                       cherrypy.config.get('parsecache.ttl', 300))
+        return self._cache
 
+    @staticmethod
+    def boolval(parm):
+        parm_ = str(parm).lower()
+        return True if parm_ in true_values else False if parm_ in false_values else None
 
     @expose
     def index(self, **_):
-        subject = "who:12345"
-        expr = """18526009| Disorder of appendix (disorder) |+
-	302168000| Inflammation of large intestine (disorder) |+
-	64572001| Disease (disorder) |:
-	{ 116676008| Associated morphology (attribute) |=23583003| Inflammation (morphologic abnormality) |,
-	363698007| Finding site (attribute) |=66754008| Appendix structure (body structure) | }"""
-        formats = self.html_formats()
-        return htmltext % vars()
+        page, etag = landing_page(self.formats)
+        check_etag(etag)
+        cherrypy.response.headers['Cache-Control'] = 'public, max-age=%d' % landing_max_age
+        return page
 
     @expose(("POST", "GET"))
     def default(self, subject='', expr='', primitive=False, shorturis=False, removesct=False, format="n3", **_):
-        subject = map_namespace(subject)
+        load_converter()
+        from rdflib import ConjunctiveGraph
+        from cgtoowl import load_result, serialize_graph, add_namespaces, map_namespace
+        # subject and expr can be repeated to convert several expressions into one graph
+        subjects = [map_namespace(s) for s in listify(subject, '')]
+        exprs = [re.sub(r'\s+', '', e, flags=re.DOTALL) for e in listify(expr, '')]
+        if len(subjects) != len(exprs):
+            return None, (400, "Number of subjects does not match number of expressions")
         primitive = self.boolval(primitive)
         shorturis = self.boolval(shorturis)
         removesct = self.boolval(removesct)
-        expr = re.sub(r'\s+', '', expr, flags=re.DOTALL)
+        key = (tuple(subjects), primitive, tuple(exprs), shorturis, removesct, format)
+        entry = self.cache.get(key)
+        if entry is None:
+            g = add_namespaces(ConjunctiveGraph())
+            entries = [(s, primitive, e) for s, e in zip(subjects, exprs)]
+            try:
+                if not all([load_result(ttlresult, g) for ttlresult in self.parser.parse_many(entries)]):
+                    if not self.parser.available():
+                        return None, (503, unavailable_error)
+                    return None, (400, conversion_error)
+            except GatewayPoolTimeout as e:
+                return None, (503, e)
+            rval = serialize_graph(g, removesctid=removesct, shorturi=shorturis, format=format)
+            if not isinstance(rval, str):
+                return rval
+            entry = (rval, '"%s"' % hashlib.sha1(rval.encode('utf-8')).hexdigest())
+            self.cache.put(key, entry)
+        rval, etag = entry
+        check_etag(etag)
+        return rval
+
+    def batch_chunksize(self, nentries):
+        """ Number of expressions per gateway call that spreads a batch of nentries expressions across the pool """
+        size = getattr(self.parser, 'size', 1)
+        return max(1, min(cherrypy.config.get('batch.chunksize', 100), -(-nentries // size)))
+
+    @expose(("POST",))
+    def batch(self, results='merged', primitive=False, shorturis=False, removesct=False, format="n3", **_):
+        """ Convert the (subject, expr, primitive) rows in the JSON or TSV body of the request.  primitive is the
+        default for rows that don't supply their own flag.  results=merged returns one graph, with the (zero based)
+        numbers of the rows that couldn't be converted in the X-Batch-Errors header.  N-Triples and N-Quads are
+        streamed as the rows are converted and report the failed rows in comment lines instead.  results=rows streams
+        a JSON list that holds the serialized graph or the error message of each row.
+        """
+        load_converter()
+        from rdflib import ConjunctiveGraph
+        from cgtoowl import load_result, serialize_graph, add_namespaces, map_namespace
+        if results not in batch_results:
+            return None, (400, "results must be one of: " + ', '.join(batch_results))
+        content_type = cherrypy.request.headers.get('Content-Type', '').split(';')[0].strip().lower()
+        reader = batch_readers.get(content_type)
+        if not reader:
+            return None, (415, "Batch body must be one of: " + ', '.join(sorted(batch_readers)))
+        try:
+            rows = reader(cherrypy.request.body.read().decode('utf-8'))
+        except ValueError as e:
+            return None, (400, e)
+        if not rows:
+            return None, (400, "No rows supplied")
+        maxrows = cherrypy.config.get('batch.maxrows', 10000)
+        if len(rows) > maxrows:
+            return None, (413, "A batch is limited to %d rows" % maxrows)
+        shorturis = self.boolval(shorturis)
+        removesct = self.boolval(removesct)
+
+        errors = {}
+        entries = []
+        for n, (subject, expr, row_primitive) in enumerate(rows):
+            expr = re.sub(r'\s+', '', expr, flags=re.DOTALL)
+            if subject and expr:
+                entries.append((n, (map_namespace(subject),
+                                    self.boolval(primitive if row_primitive is None else row_primitive), expr)))
+            else:
+                errors[n] = "Row must have a subject and an expression"
+        if format not in self.formats:
+            return None, (400, "Unsupported format: %s" % format)
+
+        if results == 'rows' or format in stream_formats:
+            # Streamed responses are committed to a 200 status once the first row is sent
+            if not self.parser.available():
+                return None, (503, unavailable_error)
+            converted = self.convert_rows(rows, entries, errors)
+            if results == 'rows':
+                return StreamedResponse(self.row_results(converted, removesct, shorturis, format), 'application/json')
+            return StreamedResponse(self.merged_ntriples(converted, removesct))
+
+        try:
+            parsed = dict(zip([n for n, _ in entries],
+                              self.parser.parse_many([e for _, e in entries], self.batch_chunksize(len(entries)))))
+        except GatewayPoolTimeout as e:
+            return None, (503, e)
+        if not all(parsed.values()) and not self.parser.available():
+            return None, (503, unavailable_error)
+
         g = add_namespaces(ConjunctiveGraph())
-        if parse_and_load(self._parser, subject, primitive, expr, g):
-            return serialize_graph(g, removesctid=removesct, shorturi=shorturis, format=format)
-        return None, (400, "Unable to convert supplied expression")
+        for n, ttlresult in parsed.items():
+            if not load_result(ttlresult, g):
+                errors[n] = conversion_error
+        if len(errors) == len(rows):
+            return None, (400, conversion_error)
+        rval = serialize_graph(g, removesctid=removesct, shorturi=shorturis, format=format)
+        if not isinstance(rval, str):
+            return rval
+        if errors:
+            cherrypy.response.headers['X-Batch-Errors'] = ','.join(str(n) for n in sorted(errors))
+        return rval
 
+    def convert_rows(self, rows, entries, errors):
+        """ Convert the rows of a batch, one row at a time, as the gateway results arrive
+        :param rows: list of (subject, expr, primitive) rows
+        :param entries: list of (row number, (subj, primitive, cgstring)) tuples to send to the gateway
+        :param errors: map from row number to error message for the rows that aren't sent to the gateway
+        :return: iterator over (row number, subject, graph or None, error message) tuples in row order
+        """
+        from rdflib import ConjunctiveGraph
+        from cgtoowl import load_result, add_namespaces
+        parsed = zip((n for n, _ in entries),
+                     self.parser.parse_many([e for _, e in entries], self.batch_chunksize(len(entries))))
+        failure = None
+        for n, (subject, _, _) in enumerate(rows):
+            if n in errors:
+                yield n, subject, None, errors[n]
+                continue
+            if failure is None:
+                try:
+                    _, ttlresult = next(parsed)
+                except GatewayPoolTimeout as e:
+                    failure = str(e)
+            if failure is not None:
+                yield n, subject, None, failure
+                continue
+            g = add_namespaces(ConjunctiveGraph())
+            if load_result(ttlresult, g):
+                yield n, subject, g, None
+            else:
+                yield n, subject, None, conversion_error if self.parser.available() else unavailable_error
 
+    @staticmethod
+    def row_results(converted, removesct, shorturis, format):
+        """ Generate the JSON list of per row results, one row at a time """
+        from cgtoowl import serialize_graph
+        yield '['
+        for n, subject, g, error in converted:
+            rval = None
+            if g is not None:
+                rval = serialize_graph(g, removesctid=removesct, shorturi=shorturis, format=format)
+                if not isinstance(rval, str):
+                    rval, error = None, str(rval[1][1])
+            yield (',' if n else '') + json.dumps(dict(row=n, subject=subject, result=rval, error=error))
+        yield ']'
 
+    @staticmethod
+    def merged_ntriples(converted, removesct):
+        """ Generate the N-Triples of each row as soon as it is converted.  The rows that can't be converted are
+        reported in comment lines. """
+        from cgtoowl import remove_sct_declarations
+        from ntriples import nt_line
+        for n, _, g, error in converted:
+            if g is None:
+                yield '# Row %d: %s\n' % (n, ' '.join(error.split()))
+            else:
+                if removesct:
+                    remove_sct_declarations(g)
+                yield ''.join(nt_line(t) for t in g)
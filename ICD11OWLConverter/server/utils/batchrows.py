@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2014, Mayo Clinic
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+# Redistributions of source code must retain the above copyright notice, this
+# list of conditions and the following disclaimer.
+#
+#     Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#
+#     Neither the name of the <ORGANIZATION> nor the names of its contributors
+#     may be used to endorse or promote products derived from this software
+#     without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+# IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,
+# INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, 
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE
+# OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+# OF THE POSSIBILITY OF SUCH DAMAGE.
+import csv
+import io
+import json
+
+# Column names of a batch row
+batch_columns = ['subject', 'expr', 'primitive']
+
+
+def json_rows(body):
+    """ Read the rows of a JSON batch request.  The body is a list of rows, each of which is either an object with
+    subject, expr and (optional) primitive members or a [subject, expr, primitive] list.
+
+    @param body: text of the request body
+    @return: list of (subject, expr, primitive) tuples.  primitive is None if the row doesn't supply it
+    @raise ValueError: if the body isn't a list of rows
+    """
+    rows = json.loads(body)
+    if not isinstance(rows, list):
+        raise ValueError("Batch body must be a list of rows")
+    rval = []
+    for row in rows:
+        if isinstance(row, dict):
+            row = [row.get(c) for c in batch_columns]
+        elif not isinstance(row, list) or not 2 <= len(row) <= 3:
+            raise ValueError("Batch row must be an object or a [subject, expr, primitive] list: %s" % json.dumps(row))
+        rval.append(_row(row))
+    return rval
+
+
+def tsv_rows(body):
+    """ Read the rows of a tab separated batch request.  Each line is a subject, an expression and, optionally, a
+    primitive flag.  A first line that holds "subject" and "expr" is a header that names the columns.
+
+    @param body: text of the request body
+    @return: list of (subject, expr, primitive) tuples.  primitive is None if the row doesn't supply it
+    @raise ValueError: if a line has too few or too many columns
+    """
+    lines = [row for row in csv.reader(io.StringIO(body), delimiter='\t') if row]
+    columns = batch_columns
+    if lines:
+        header = [c.strip().lower() for c in lines[0]]
+        if 'subject' in header and 'expr' in header:
+            columns = header
+            lines.pop(0)
+    rval = []
+    for row in lines:
+        if len(row) > len(columns) or len(row) < 2:
+            raise ValueError("Batch row must have a subject, an expression and an optional primitive flag: %s" %
+                             '\t'.join(row))
+        entry = dict(zip(columns, row))
+        rval.append(_row([entry.get(c) for c in batch_columns]))
+    return rval
+
+
+def _row(row):
+    subject, expr, primitive = (list(row) + [None])[:3]
+    return '' if subject is None else str(subject), '' if expr is None else str(expr), primitive
+
+
+# Readers for the supported request body types
+batch_readers = {'application/json': json_rows,
+                 'text/tab-separated-values': tsv_rows,
+                 'text/plain': tsv_rows}
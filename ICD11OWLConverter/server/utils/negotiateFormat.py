@@ -26,7 +26,9 @@
 # LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE
 # OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
 # OF THE POSSIBILITY OF SUCH DAMAGE.
-from server.utils.kwutil import *
+import re
+from functools import lru_cache
+
 from server.utils.listutils import listify
 
 # A map between a format identifier and the equivalent mime types that come in the header
@@ -43,15 +45,108 @@ format_map = {'txt': 'text/plain',
               'turtle':('text/turtle',),
               'nt': 'application/nt-triples',}
 
+# format_map with every entry as a tuple of mime types
+format_types = {k: tuple(listify(v)) for k, v in format_map.items()}
 
-def negotiate_format(formats, rqst_header):
-    matchlist = []
+# Format returned when nothing in the offer is acceptable, and the Accept header assumed when there isn't one
+default_format = 'html'
+default_accept = 'text/html'
+
+# Elements of a comma separated header field and parameters of an element, allowing for quoted strings
+element_re = re.compile(r'(?:[^,"]|"(?:[^"\\]|\\.)*")+')
+parameter_re = re.compile(r'(?:[^;"]|"(?:[^"\\]|\\.)*")+')
+qvalue_re = re.compile(r'^(?:0(?:\.\d{0,3})?|1(?:\.0{0,3})?)$')
+
+
+def parse_accept(accept):
+    """ Parse an Accept header field (RFC 7231, section 5.3.2)
+
+    @param accept: text of the Accept header
+    @return: list of (type, subtype, parameters, quality) tuples in the order they appear in the header.  Types and
+    parameter names are lower case, parameters is a tuple of (name, value) pairs that precede the q parameter and
+    quality is the q value as a float.  Malformed media ranges are dropped.
+    """
+    rval = []
+    for element in element_re.findall(accept):
+        parts = [p.strip() for p in parameter_re.findall(element)]
+        if not parts or parts[0].count('/') != 1:
+            continue
+        mtype, subtype = (t.strip().lower() for t in parts[0].split('/'))
+        if not mtype or not subtype or (mtype == '*' and subtype != '*'):
+            continue
+        params = []
+        quality = 1.0
+        for param in parts[1:]:
+            name, _, value = param.partition('=')
+            name = name.strip().lower()
+            value = value.strip()
+            if name == 'q':
+                # Anything following the weight is an accept extension
+                quality = float(value) if qvalue_re.match(value) else None
+                break
+            if name:
+                params.append((name, value.strip('"')))
+        if quality is not None:
+            rval.append((mtype, subtype, tuple(params), quality))
+    return rval
+
+
+@lru_cache(maxsize=64)
+def offered_types(formats):
+    """ Return the mime types that a set of formats can be requested as, in order of preference
+
+    @param formats: tuple of available format identifiers, in order of preference
+    @return: tuple of (type, subtype, format) tuples.  Where formats share a mime type, it is assigned to the first of
+    them in format_map
+    """
+    available = set(formats)
+    reverse_index = {}
+    for k, types in format_types.items():
+        if k in available:
+            for t in types:
+                reverse_index.setdefault(t, k)
+    rval = []
     for k in formats:
-        matchlist += (listify(format_map.get(k, 'txt/plain')))
-    bm = best_match(matchlist,
-                     kwget(['Accept'], rqst_header, preference_order, 'text/html'))
-    if bm:
-        for me in format_map.items():
-            if bm in listify(me[1]):
-                return me[0]
-    return 'html'
\ No newline at end of file
+        for t in format_types.get(k, ()):
+            if reverse_index[t] == k:
+                rval.append(tuple(t.split('/')) + (k,))
+    return tuple(rval)
+
+
+@lru_cache(maxsize=1024)
+def negotiate(formats, accept):
+    """ Choose the format for an Accept header.  Each offered mime type gets the quality of the most specific media
+    range that matches it.  Of the types with the highest non-zero quality, the one that matches the media range
+    that comes first in the header wins, then the one that matches most specifically, then the first one offered.
+
+    @param formats: tuple of available format identifiers, in order of preference
+    @param accept: text of the Accept header
+    @return: format identifier
+    """
+    ranges = parse_accept(accept)
+    best = None
+    for offer, (mtype, subtype, k) in enumerate(offered_types(formats)):
+        match = None
+        for pos, (rtype, rsubtype, params, quality) in enumerate(ranges):
+            if rtype in ('*', mtype) and rsubtype in ('*', subtype):
+                specificity = (rtype != '*') + (rsubtype != '*') + bool(params)
+                if match is None or specificity > match[1]:
+                    match = (pos, specificity, quality)
+        if match and match[2] > 0:
+            key = (-match[2], match[0], -match[1], offer)
+            if best is None or key < best[0]:
+                best = (key, k)
+    return best[1] if best else default_format
+
+
+def negotiate_format(formats, rqst_header):
+    """ Choose the format of a response
+
+    @param formats: list of available format identifiers, in order of preference
+    @param rqst_header: request headers
+    @return: format identifier
+    """
+    accept = rqst_header.get('Accept')
+    if accept is None:
+        accept = next((v for k, v in rqst_header.items() if k.lower() == 'accept'), default_accept)
+    return negotiate(tuple(formats), accept)
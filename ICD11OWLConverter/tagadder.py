@@ -28,37 +28,82 @@
 # OF THE POSSIBILITY OF SUCH DAMAGE.
 
 import sys
-import argparse
-from rdflib import Graph, RDFS, Literal
+from rdflib import RDFS, Literal
+
+from graphstore import GraphStore
+from cli import tagadder_parser
+from prefixes import PrefixIndex
+from ntriples import nt_term, nt_terms, nt_value
 
 labelmaps = [('http://snomed.info/id/', 'SCT'),
              ('http://id.who.int/icd/entity/', 'ICD'),
              ('http://snomed.info/sep/', 'SEP'),
              ('http://who.int/icd/11/xchapter/', 'XCH')]
+label_index = PrefixIndex(dict(labelmaps))
+
+# Formats that can be tagged line by line
+stream_formats = ['nt', 'nquads']
+
+label_nt = nt_term(RDFS.label)
+
+
+def tagged_label(tag, value):
+    """ Return the tagged form of a label """
+    return Literal(tag + '  ' + value)
 
 
 def main(args):
     """ Rewrite an OWL file adding a prefixes to the SNOMED and ICD Labels
     """
+    run(tagadder_parser().parse_args(args))
 
-    optparser = argparse.ArgumentParser(description="Add a tag prefix to the labels in the supplied owl file")
-    optparser.add_argument('owlfile', help="Input OWL file")
-    optparser.add_argument('-f', '--format', help="File format", default="n3")
 
-    opts = optparser.parse_args(args)
+def run(opts):
+    """ Tag the labels in an OWL file, using the options parsed by cli.tagadder_parser """
+    if opts.stream:
+        if opts.format not in stream_formats:
+            print("--stream requires one of the %s formats" % ', '.join(stream_formats), file=sys.stderr)
+            return
+        with open(opts.owlfile, encoding='utf-8') as infile:
+            tag_ntriples(infile, sys.stdout)
+        return
 
-    g = Graph()
+    with GraphStore(opts.store, opts.storepath) as graphs:
+        add_tags(opts, graphs)
+
+
+def add_tags(opts, graphs):
+    g = graphs.graph('tagged')
     g.parse(opts.owlfile, format=opts.format)
 
     # Iterate over the labels
     for subj, desc in list(g.subject_objects(RDFS.label)):
-        for p, t in labelmaps:
-            if str(subj).startswith(p):
-                g.remove([subj, RDFS.label, desc])
-                g.add([subj, RDFS.label, Literal(t + '  ' + str(desc))])
-                break
-    output = g.serialize(format=opts.format).decode('utf-8')
-    sys.stdout.write(output)
+        t = label_index.lookup(str(subj))
+        if t:
+            g.remove([subj, RDFS.label, desc])
+            g.add([subj, RDFS.label, tagged_label(t, str(desc))])
+    out = getattr(sys.stdout, 'buffer', None)
+    if out is None:
+        # stdout has been replaced by a text stream
+        sys.stdout.write(g.serialize(format=opts.format).decode('utf-8'))
+    else:
+        sys.stdout.flush()
+        g.serialize(destination=out, format=opts.format)
+
+
+def tag_ntriples(infile, outfile):
+    """ Tag the labels in an N-Triples (or N-Quads) file line by line
+    :param infile: input text file
+    :param outfile: text file to write the tagged lines to
+    """
+    for line in infile:
+        terms = nt_terms(line)
+        if terms is not None:
+            s, p, o, g = terms
+            t = label_index.lookup(nt_value(s)) if p == label_nt else None
+            if t:
+                line = ' '.join([s, p, nt_term(tagged_label(t, nt_value(o)))] + ([g] if g else [])) + ' .\n'
+        outfile.write(line)
 
 
 if __name__ == '__main__':
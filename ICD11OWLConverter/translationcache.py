@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2014, Mayo Clinic
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+# Redistributions of source code must retain the above copyright notice, this
+# list of conditions and the following disclaimer.
+#
+#     Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#
+#     Neither the name of the <ORGANIZATION> nor the names of its contributors
+#     may be used to endorse or promote products derived from this software
+#     without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+# IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,
+# INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, 
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE
+# OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+# OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import re
+import sqlite3
+import hashlib
+
+from ConverterGateway import chunks
+
+# Whitespace outside of the |term| labels doesn't change the meaning of an expression
+label_split_re = re.compile(r'(\|[^|]*\|)')
+
+
+def normalize_expression(cgexpr):
+    """ Remove the whitespace that is not part of a term label from a compositional grammar expression
+    :param cgexpr: expression to normalize
+    :return: normalized expression
+    """
+    return ''.join(e if e.startswith('|') else re.sub(r'\s+', '', e) for e in label_split_re.split(cgexpr))
+
+
+class TranslationCache(object):
+    def __init__(self, path, version):
+        """ Construct a persistent cache of compositional grammar to OWL translations.
+
+        @param path: name of the sqlite database file holding the cache
+        @param version: version stamp of the parser that produced the translations.  If it differs from the
+        version recorded in the cache, the existing translations are discarded.
+        """
+        if not version:
+            raise ValueError("A translation cache needs the version of the parser that fills it")
+        self.hits = 0
+        self.misses = 0
+        self._db = sqlite3.connect(path)
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS translations (key TEXT PRIMARY KEY, owl TEXT)")
+        version = str(version)
+        row = self._db.execute("SELECT value FROM meta WHERE name = 'version'").fetchone()
+        if not row or row[0] != version:
+            self._db.execute("DELETE FROM translations")
+            self._db.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)", (version,))
+        self._db.commit()
+
+    @staticmethod
+    def key(subj, primitive, cgexpr):
+        """ Return the content address of a translation
+        :param subj: subject URI
+        :param primitive: True means subClassOf, False means equivalentClass
+        :param cgexpr: compositional grammar expression
+        :return: cache key
+        """
+        return hashlib.sha1('\n'.join([str(subj), str(bool(primitive)), normalize_expression(cgexpr)])
+                            .encode('utf-8')).hexdigest()
+
+    def get(self, subj, primitive, cgexpr):
+        row = self._db.execute("SELECT owl FROM translations WHERE key = ?",
+                               (self.key(subj, primitive, cgexpr),)).fetchone()
+        return row[0] if row else None
+
+    def put(self, subj, primitive, cgexpr, owl):
+        self._db.execute("INSERT OR REPLACE INTO translations VALUES (?, ?)",
+                         (self.key(subj, primitive, cgexpr), owl))
+
+    def parse(self, gw, subj, primitive, cgexpr):
+        """ Return the cached translation of an expression, invoking the gateway if it isn't in the cache
+        :param gw: parser gateway
+        :param subj: subject URI
+        :param primitive: True means subClassOf, False means equivalentClass
+        :param cgexpr: expression to parse
+        :return: OWL equivalent or None if an error
+        """
+        return next(self.parse_many(gw, [(subj, primitive, cgexpr)]))
+
+    def parse_many(self, gw, entries, chunksize=1000):
+        """ Translate a sequence of expressions, sending only the ones that aren't in the cache to the gateway.
+        Failed translations are not cached.
+        :param gw: parser gateway
+        :param entries: iterable of (subj, primitive, cgexpr) tuples
+        :param chunksize: number of expressions to look up before calling the gateway
+        :return: iterator over the OWL equivalents (None for errors) in the same order as entries
+        """
+        for chunk in chunks(entries, chunksize):
+            rslts = [self.get(*e) for e in chunk]
+            misses = [e for e, r in zip(chunk, rslts) if r is None]
+            self.hits += len(chunk) - len(misses)
+            self.misses += len(misses)
+            parsed = iter(gw.parse_many(misses))
+            for i, rslt in enumerate(rslts):
+                if rslt is None:
+                    rslts[i] = next(parsed)
+                    if rslts[i]:
+                        self.put(chunk[i][0], chunk[i][1], chunk[i][2], rslts[i])
+            self._db.commit()
+            for rslt in rslts:
+                yield rslt
+
+    def close(self):
+        self._db.commit()
+        self._db.close()
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2014, Mayo Clinic
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+# Redistributions of source code must retain the above copyright notice, this
+# list of conditions and the following disclaimer.
+#
+#     Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#
+#     Neither the name of the <ORGANIZATION> nor the names of its contributors
+#     may be used to endorse or promote products derived from this software
+#     without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+# IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,
+# INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, 
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE
+# OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+# OF THE POSSIBILITY OF SUCH DAMAGE.
+
+""" Micro-benchmark comparing the original per-request content negotiation with the cached negotiate_format
+
+usage: python3 -m benchmarks.bench_negotiate [-n REQUESTS]
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'ICD11OWLConverter'))
+
+from rdflib.plugin import plugins
+from rdflib.serializer import Serializer
+from server.utils.kwutil import preference_order, best_match
+from server.utils.listutils import listify
+from server.utils.negotiateFormat import format_map, negotiate_format
+
+# Accept headers of the kind the server sees, from browsers, scripts and RDF clients
+accept_headers = ['text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+                  'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+                  '*/*',
+                  'text/turtle',
+                  'text/turtle;q=1.0, application/rdf+xml;q=0.9, */*;q=0.1',
+                  'application/n-quads',
+                  'application/rdf+xml, text/xml;q=0.5']
+
+
+def legacy_negotiate_format(formats, rqst_header):
+    """ The original negotiate_format implementation, with kwget's case insensitive header lookup inlined """
+    matchlist = []
+    for k in formats:
+        matchlist += (listify(format_map.get(k, 'txt/plain')))
+    headers = {k.lower(): v for k, v in rqst_header.items()}
+    bm = best_match(matchlist, preference_order(headers.get('accept', 'text/html')))
+    if bm:
+        for me in format_map.items():
+            if bm in listify(me[1]):
+                return me[0]
+    return 'html'
+
+
+def timed(f, formats, requests):
+    start = time.perf_counter()
+    for headers in requests:
+        f(formats, headers)
+    return time.perf_counter() - start
+
+
+def main(args):
+    optparser = argparse.ArgumentParser(description="Benchmark the negotiate_format implementations")
+    optparser.add_argument('-n', '--requests', help="Number of requests to negotiate", type=int, default=100000)
+    opts = optparser.parse_args(args)
+
+    formats = [e.name for e in plugins(kind=Serializer) if '/' not in e.name]
+    requests = [{'Host': 'localhost:8082', 'User-Agent': 'bench', 'Accept': accept_headers[i % len(accept_headers)],
+                 'Accept-Encoding': 'gzip, deflate'} for i in range(opts.requests)]
+    print("%d requests, %d distinct Accept headers, %d formats" % (len(requests), len(accept_headers), len(formats)))
+
+    legacy_time = timed(legacy_negotiate_format, formats, requests)
+    cached_time = timed(negotiate_format, formats, requests)
+    print("legacy negotiate_format: %8.3fs (%6.2fus per request)" % (legacy_time, legacy_time * 1e6 / len(requests)))
+    print("cached negotiate_format: %8.3fs (%6.2fus per request)" % (cached_time, cached_time * 1e6 / len(requests)))
+    print("speedup:                 %8.1fx" % (legacy_time / cached_time))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2014, Mayo Clinic
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+# Redistributions of source code must retain the above copyright notice, this
+# list of conditions and the following disclaimer.
+#
+#     Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#
+#     Neither the name of the <ORGANIZATION> nor the names of its contributors
+#     may be used to endorse or promote products derived from this software
+#     without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+# IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,
+# INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, 
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE
+# OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+# OF THE POSSIBILITY OF SUCH DAMAGE.
+
+""" Micro-benchmark comparing the per-line, per-namespace fix_prefixes with the single expression PrefixShortener
+
+usage: python3 -m benchmarks.bench_prefixes [-n LINES]
+"""
+import os
+import re
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'ICD11OWLConverter'))
+
+from namespaces import namespaces
+from prefixes import PrefixShortener
+
+
+def legacy_fix_prefixes(owltext):
+    """ The original fix_prefixes implementation """
+    def fix_prefix(l):
+        for k, v in namespaces.items():
+            l = re.sub('<' + str(v) + r'(.*?)>', k + r':\1', l, flags=re.DOTALL)
+        return l
+    return '\n'.join([l if l.startswith('@prefix') else fix_prefix(l) for l in owltext.split('\n')])
+
+
+def synthetic_turtle(nlines):
+    """ Generate a turtle text that looks like cgtoowl output
+    :param nlines: approximate number of lines to generate
+    """
+    lines = ['@prefix %s: <%s> .' % (k, v) for k, v in sorted(namespaces.items())] + ['']
+    templates = [t % namespaces for t in ['<%(who)s%%d> a owl:Class ;',
+                                          '    rdfs:label "Entity %%d"@en ;',
+                                          '    rdfs:subClassOf [ a owl:Class ;',
+                                          '            owl:intersectionOf ( <%(sctid)s%%d> [ a owl:Restriction ;',
+                                          '                        owl:onProperty <%(sctid)s%%d> ;',
+                                          '                        owl:someValuesFrom <%(sctid)s%%d> ] ) ],',
+                                          '        <%(who)s%%d> .',
+                                          '']]
+    for i in range(nlines // len(templates)):
+        lines += [t % i if '%d' in t else t for t in templates]
+    return '\n'.join(lines)
+
+
+def timed(f, *args):
+    start = time.perf_counter()
+    rval = f(*args)
+    return rval, time.perf_counter() - start
+
+
+def main(args):
+    optparser = argparse.ArgumentParser(description="Benchmark the fix_prefixes implementations")
+    optparser.add_argument('-n', '--lines', help="Number of lines in the synthetic turtle file", type=int,
+                           default=1000000)
+    opts = optparser.parse_args(args)
+
+    with tempfile.TemporaryFile('w+') as ttlfile:
+        ttlfile.write(synthetic_turtle(opts.lines))
+        ttlfile.seek(0)
+        text = ttlfile.read()
+    print("%d lines, %d bytes" % (text.count('\n') + 1, len(text)))
+
+    legacy, legacy_time = timed(legacy_fix_prefixes, text)
+    shortener, build_time = timed(PrefixShortener)
+    shortened, shortener_time = timed(shortener.shorten, text)
+    assert legacy == shortened, "Outputs differ"
+    print("legacy fix_prefixes: %8.3fs" % legacy_time)
+    print("PrefixShortener:     %8.3fs (+ %.6fs to build)" % (shortener_time, build_time))
+    print("speedup:             %8.1fx" % (legacy_time / shortener_time))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2014, Mayo Clinic
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+# Redistributions of source code must retain the above copyright notice, this
+# list of conditions and the following disclaimer.
+#
+#     Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#
+#     Neither the name of the <ORGANIZATION> nor the names of its contributors
+#     may be used to endorse or promote products derived from this software
+#     without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+# IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,
+# INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, 
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE
+# OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+# OF THE POSSIBILITY OF SUCH DAMAGE.
+
+""" Start up time of the batch tools: the time to print --help when a tool is run as a script, which imports the
+whole tool, and through the cli entry point (the console scripts), which parses the arguments first.
+
+usage: python3 -m benchmarks.bench_startup [-r RUNS]
+"""
+import os
+import sys
+import argparse
+import statistics
+import subprocess
+import time
+
+base = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+tooldir = os.path.join(base, 'ICD11OWLConverter')
+
+# Map from tool to its cli entry point
+tools = {'cgtoowl': 'cgtoowl_main',
+         'tagadder': 'tagadder_main',
+         'isolateEquivalents': 'isolate_equivalents_main',
+         'cardio_expressions_to_owl': 'cardio_main'}
+
+# Reports whether the heavy dependencies were loaded
+report_modules = "\nprint(*['%s=%s' % (m, m in sys.modules) for m in ('rdflib', 'py4j')], file=sys.stderr)"
+
+
+def script_code(tool):
+    """ Code that runs tool --help the way python tool.py --help does """
+    return ("import sys, runpy\nsys.path.insert(0, %r)\nsys.argv = [%r, '--help']\n"
+            "try:\n    runpy.run_path(%r, run_name='__main__')\nexcept SystemExit:\n    pass" %
+            (tooldir, tool + '.py', os.path.join(tooldir, tool + '.py')))
+
+
+def cli_code(tool):
+    """ Code that runs tool --help the way the console script does """
+    return ("import sys\nsys.path.insert(0, %r)\nfrom ICD11OWLConverter.cli import %s\n"
+            "try:\n    %s(['--help'])\nexcept SystemExit:\n    pass" % (base, tools[tool], tools[tool]))
+
+
+def time_code(code, runs):
+    """ Run code in a fresh interpreter runs times
+    :return: list of wall clock seconds, modules report of the last run
+    """
+    times = []
+    report = ''
+    for _ in range(runs):
+        start = time.perf_counter()
+        rslt = subprocess.run([sys.executable, '-c', code + report_modules], stdout=subprocess.DEVNULL,
+                              stderr=subprocess.PIPE, universal_newlines=True, check=True)
+        times.append(time.perf_counter() - start)
+        report = rslt.stderr.strip().splitlines()[-1]
+    return times, report
+
+
+def main(args):
+    optparser = argparse.ArgumentParser(description="Benchmark the start up time of the batch tools")
+    optparser.add_argument('-r', '--runs', help="Number of runs of each command", type=int, default=5)
+    opts = optparser.parse_args(args)
+
+    baseline, _ = time_code('import sys', opts.runs)
+    print("Interpreter start up: %.1fms" % (statistics.median(baseline) * 1000))
+    print("%-28s %-8s %10s %10s  %s" % ("tool", "entry", "median ms", "min ms", "loaded"))
+    for tool in sorted(tools):
+        for entry, code in (('script', script_code(tool)), ('cli', cli_code(tool))):
+            times, report = time_code(code, opts.runs)
+            print("%-28s %-8s %10.1f %10.1f  %s" % (tool, entry, statistics.median(times) * 1000, min(times) * 1000,
+                                                    report))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
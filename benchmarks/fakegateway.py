@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2014, Mayo Clinic
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+# Redistributions of source code must retain the above copyright notice, this
+# list of conditions and the following disclaimer.
+#
+#     Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#
+#     Neither the name of the <ORGANIZATION> nor the names of its contributors
+#     may be used to endorse or promote products derived from this software
+#     without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+# IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,
+# INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, 
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE
+# OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+# OF THE POSSIBILITY OF SUCH DAMAGE.
+
+""" A pure Python stand-in for the Java compositional grammar gateway.
+
+install() replaces the py4j JavaGateway used by ConverterGateway with an in-process object that exposes
+org.mayo.parserpy.GatewayParser.parser.cgparse (and cgparsemany, the cgparsent / cgparsemanynt N-Triples variants and
+version) and answers with canned turtle or N-Triples built from the expression.  Expressions without any concepts are
+rejected with a Py4JJavaError, as the Java parser does for malformed input.  An optional latency is added to every call
+to approximate the py4j round trip.
+"""
+import re
+import time
+
+import ConverterGateway
+
+concept_re = re.compile(r'(\d+)\s*\|([^|]*)\|')
+
+ttl_header = """@prefix owl: <http://www.w3.org/2002/07/owl#> .
+@prefix rdfs: <http://www.w3.org/2000/01/rdf-schema#> .
+@prefix xsd: <http://www.w3.org/2001/XMLSchema#> .
+@base <http://snomed.info/id/#> .
+
+"""
+
+owl = 'http://www.w3.org/2002/07/owl#'
+rdf = 'http://www.w3.org/1999/02/22-rdf-syntax-ns#'
+rdfs = 'http://www.w3.org/2000/01/rdf-schema#'
+xsd_string = 'http://www.w3.org/2001/XMLSchema#string'
+
+
+class FakeJavaError(ConverterGateway.Py4JJavaError):
+    """ Py4JJavaError that doesn't need a Java exception to describe itself """
+    def __init__(self, msg):
+        Exception.__init__(self, msg)
+        self.errmsg = msg
+        self.java_exception = None
+
+    def __str__(self):
+        return self.errmsg
+
+
+class FakeParser(object):
+    def __init__(self, latency=0.0, batch=True):
+        """ Stand-in for the Java GatewayParser.parser object
+
+        @param latency: seconds to wait on every call
+        @param batch: True means expose the cgparsemany batch entry point
+        """
+        self.latency = latency
+        self.batch = batch
+        self.calls = 0
+
+    def version(self):
+        return "fake-1.0"
+
+    def cgparse(self, subj, primitive, cgstring):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return self._translate(subj, primitive, cgstring)
+
+    def cgparsemany(self, subjs, primitives, cgstrings):
+        if not self.batch:
+            raise ConverterGateway.Py4JError("Method cgparsemany does not exist")
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return [self._translate(*e) for e in zip(subjs, primitives, cgstrings)]
+
+    def cgparsent(self, subj, primitive, cgstring):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return self._translate_nt(subj, primitive, cgstring)
+
+    def cgparsemanynt(self, subjs, primitives, cgstrings):
+        if not self.batch:
+            raise ConverterGateway.Py4JError("Method cgparsemanynt does not exist")
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return [self._translate_nt(*e) for e in zip(subjs, primitives, cgstrings)]
+
+    @staticmethod
+    def _translate(subj, primitive, cgstring):
+        """ Build the turtle for an expression of the form focus |label|: attr |label| = value |label|, ... """
+        concepts = concept_re.findall(cgstring)
+        if not concepts:
+            raise FakeJavaError("Unable to parse expression: %s" % cgstring)
+        sct = lambda c: '<http://snomed.info/id/%s>' % c[0]
+        restrictions = ['[ a owl:Restriction ; owl:onProperty %s ; owl:someValuesFrom %s ]' % (sct(a), sct(v))
+                        for a, v in zip(concepts[1::2], concepts[2::2])]
+        body = '<%s> %s [ a owl:Class ; owl:intersectionOf ( %s ) ] .\n' % \
+               (subj, 'rdfs:subClassOf' if primitive else 'owl:equivalentClass',
+                ' '.join([sct(concepts[0])] + restrictions))
+        decls = ''.join('%s a owl:Class ; rdfs:label "%s"^^xsd:string .\n' % (sct(c), c[1]) for c in concepts)
+        return ttl_header + body + decls
+
+    @staticmethod
+    def _translate_nt(subj, primitive, cgstring):
+        """ Build the N-Triples equivalent of _translate """
+        concepts = concept_re.findall(cgstring)
+        if not concepts:
+            raise FakeJavaError("Unable to parse expression: %s" % cgstring)
+        sct = lambda c: '<http://snomed.info/id/%s>' % c[0]
+        lines = ['<%s> <%s> _:c .' % (subj, rdfs + 'subClassOf' if primitive else owl + 'equivalentClass'),
+                 '_:c <%stype> <%sClass> .' % (rdf, owl),
+                 '_:c <%sintersectionOf> _:l0 .' % owl]
+        members = [sct(concepts[0])]
+        for i, (a, v) in enumerate(zip(concepts[1::2], concepts[2::2])):
+            lines += ['_:r%d <%stype> <%sRestriction> .' % (i, rdf, owl),
+                      '_:r%d <%sonProperty> %s .' % (i, owl, sct(a)),
+                      '_:r%d <%ssomeValuesFrom> %s .' % (i, owl, sct(v))]
+            members.append('_:r%d' % i)
+        for i, member in enumerate(members):
+            lines += ['_:l%d <%sfirst> %s .' % (i, rdf, member),
+                      '_:l%d <%srest> %s .' % (i, rdf, '_:l%d' % (i + 1) if i + 1 < len(members) else
+                                               '<%snil>' % rdf)]
+        for c in concepts:
+            lines += ['%s <%stype> <%sClass> .' % (sct(c), rdf, owl),
+                      '%s <%slabel> "%s"^^<%s> .' % (sct(c), rdfs, c[1], xsd_string)]
+        return '\n'.join(lines) + '\n'
+
+
+class _JVMView(object):
+    """ Resolves org.mayo.parserpy.GatewayParser.parser to the fake parser and any other static call to a timestamp """
+    def __init__(self, parser):
+        self.parser = parser
+
+    def __getattr__(self, item):
+        return self
+
+    def __call__(self, *_):
+        # System.currentTimeMillis() health check
+        return int(time.time() * 1000)
+
+
+class FakeJavaGateway(object):
+    parser = None
+
+    def __init__(self, *_, **__):
+        self.jvm = _JVMView(self.parser)
+        self._gateway_client = None
+
+    def close(self):
+        pass
+
+
+class FakeListConverter(object):
+    def convert(self, pylist, _):
+        return list(pylist)
+
+
+_originals = (ConverterGateway.JavaGateway, ConverterGateway.GatewayClient, ConverterGateway.ListConverter)
+
+
+def install(latency=0.0, batch=True):
+    """ Route all ConverterGateway connections to a fake parser
+    :param latency: seconds to wait on every gateway call
+    :param batch: True means the fake parser has a batch entry point
+    :return: the fake parser
+    """
+    FakeJavaGateway.parser = FakeParser(latency, batch)
+    ConverterGateway.JavaGateway = FakeJavaGateway
+    ConverterGateway.GatewayClient = lambda port=None: None
+    ConverterGateway.ListConverter = FakeListConverter
+    return FakeJavaGateway.parser
+
+
+def uninstall():
+    """ Connect to the real gateway again """
+    ConverterGateway.JavaGateway, ConverterGateway.GatewayClient, ConverterGateway.ListConverter = _originals
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2014, Mayo Clinic
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+# Redistributions of source code must retain the above copyright notice, this
+# list of conditions and the following disclaimer.
+#
+#     Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#
+#     Neither the name of the <ORGANIZATION> nor the names of its contributors
+#     may be used to endorse or promote products derived from this software
+#     without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+# IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,
+# INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, 
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE
+# OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+# OF THE POSSIBILITY OF SUCH DAMAGE.
+
+""" Throughput benchmarks for the conversion pipeline, using a fake gateway in place of the Java converter.
+
+usage: python3 -m benchmarks.run [-n SIZE [SIZE ...]] [-l LATENCY] [-w WORKERS] [-t] [-s STORE]
+
+The peak RSS column is the high-water mark of the whole process, so compare graph stores in separate runs.
+
+The stages share one set of files and run in order: the later stages read the output that the cgtoowl stage writes.
+"""
+import io
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+from contextlib import redirect_stdout, redirect_stderr
+
+base = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(base, 'ICD11OWLConverter'))
+sys.path.append(base)
+
+from rdflib import Graph
+
+from benchmarks import fakegateway
+from benchmarks.synthetic import write_icd11_owl
+import cgtoowl
+from runstats import peak_rss_kb
+from graphstore import store_names
+import isolateEquivalents
+import tagadder
+
+
+class PipelineTimings(object):
+    def __init__(self, nclasses, latency=0.0, workers=1, ntriples=False, store='memory'):
+        """ The stages of the conversion pipeline, run on a synthetic input with a fake gateway
+
+        @param nclasses: number of classes in the input
+        @param latency: simulated gateway latency in seconds
+        @param workers: number of concurrent gateway connections for cgtoowl
+        @param ntriples: have the gateway return N-Triples rather than turtle
+        @param store: graph store for the conversion tools
+        """
+        self.nclasses = nclasses
+        self.latency = latency
+        self.workers = workers
+        self.ntriples = ntriples
+        self.store = store
+
+    def setup(self):
+        fakegateway.install(self.latency)
+        self.tmpdir = tempfile.mkdtemp()
+        self.owlfile = os.path.join(self.tmpdir, 'icd11_%d.owl' % self.nclasses)
+        self.outfile = os.path.join(self.tmpdir, 'icd11_%d.ttl' % self.nclasses)
+        write_icd11_owl(self.owlfile, self.nclasses)
+
+    def teardown(self):
+        shutil.rmtree(self.tmpdir)
+        fakegateway.uninstall()
+
+    def prepare_stage(self, stage):
+        """ Build the inputs of the stages that don't start from a file """
+        if stage == 'serialize_graph':
+            self.graph = Graph().parse(self.outfile, format='turtle')
+        elif stage == 'fix_prefixes':
+            self.text = open(self.outfile).read()
+
+    def cgtoowl(self):
+        cgtoowl.main([self.owlfile, '-o', self.outfile, '-w', str(self.workers), '--store', self.store] +
+                     (['--ntriples'] if self.ntriples else []))
+
+    def serialize_graph(self):
+        cgtoowl.serialize_graph(self.graph, removesctid=True)
+
+    def fix_prefixes(self):
+        cgtoowl.fix_prefixes(self.text)
+
+    def isolateEquivalents(self):
+        isolateEquivalents.main([self.outfile, '-f', 'turtle', '--store', self.store])
+
+    def tagadder(self):
+        tagadder.main([self.outfile, '-f', 'turtle', '--store', self.store])
+
+
+stages = ['cgtoowl', 'serialize_graph', 'fix_prefixes', 'isolateEquivalents', 'tagadder']
+
+
+def run(sizes, latency=0.0, workers=1, ntriples=False, store='memory'):
+    """ Time every stage of the pipeline for each input size
+    :param sizes: list of numbers of classes
+    :param latency: simulated gateway latency in seconds
+    :param workers: number of concurrent gateway connections for cgtoowl
+    :param ntriples: have the gateway return N-Triples rather than turtle
+    :param store: graph store for the conversion tools
+    :return: list of (size, stage, seconds, peak RSS KB) tuples
+    """
+    rval = []
+    for size in sizes:
+        bench = PipelineTimings(size, latency, workers, ntriples, store)
+        bench.setup()
+        try:
+            for stage in stages:
+                bench.prepare_stage(stage)
+                with redirect_stdout(io.StringIO()), redirect_stderr(io.StringIO()):
+                    start = time.perf_counter()
+                    getattr(bench, stage)()
+                    rval.append((size, stage, time.perf_counter() - start, peak_rss_kb()))
+        finally:
+            bench.teardown()
+    return rval
+
+
+def main(args):
+    optparser = argparse.ArgumentParser(description="Benchmark the ICD-11 conversion pipeline with a fake gateway")
+    optparser.add_argument('-n', '--sizes', help="Number of classes in the synthetic inputs", type=int, nargs='+',
+                           default=[1000, 10000])
+    optparser.add_argument('-l', '--latency', help="Simulated gateway call latency (seconds)", type=float,
+                           default=0.0)
+    optparser.add_argument('-w', '--workers', help="Number of concurrent gateway connections", type=int, default=1)
+    optparser.add_argument('-t', '--ntriples', help="Have the gateway return N-Triples rather than turtle",
+                           action="store_true")
+    optparser.add_argument('-s', '--store', help="Graph store (default: memory)", choices=store_names,
+                           default='memory')
+    opts = optparser.parse_args(args)
+
+    print("Graph store: %s" % opts.store)
+    print("%10s  %-20s %10s %12s %14s" % ("classes", "stage", "seconds", "classes/sec", "peak RSS KB"))
+    for size, stage, elapsed, rss in run(opts.sizes, opts.latency, opts.workers, opts.ntriples, opts.store):
+        print("%10d  %-20s %10.3f %12.0f %14s" % (size, stage, elapsed, size / elapsed if elapsed else 0, rss))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2014, Mayo Clinic
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+# Redistributions of source code must retain the above copyright notice, this
+# list of conditions and the following disclaimer.
+#
+#     Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#
+#     Neither the name of the <ORGANIZATION> nor the names of its contributors
+#     may be used to endorse or promote products derived from this software
+#     without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+# IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,
+# INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, 
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE
+# OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+# OF THE POSSIBILITY OF SUCH DAMAGE.
+
+""" Synthetic ICD-11 OWL inputs for the benchmarks """
+from xml.sax.saxutils import escape
+
+header = """<?xml version="1.0"?>
+<!DOCTYPE rdf:RDF [
+<!ENTITY icdf "http://who.int/field/">
+<!ENTITY owl "http://www.w3.org/2002/07/owl#">
+<!ENTITY xsd "http://www.w3.org/2001/XMLSchema#">
+<!ENTITY rdfs "http://www.w3.org/2000/01/rdf-schema#">
+<!ENTITY rdf "http://www.w3.org/1999/02/22-rdf-syntax-ns#">
+]>
+<rdf:RDF xmlns="http://who.int/" xmlns:rdfs="http://www.w3.org/2000/01/rdf-schema#" xmlns:icdf="http://who.int/field/" \
+xmlns:owl="http://www.w3.org/2002/07/owl#" xmlns:xsd="http://www.w3.org/2001/XMLSchema#" \
+xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#" xml:base="http://who.int/">
+<owl:Ontology rdf:about="http://who.int/icd/11">
+    <rdfs:label>ICD-11 in OWL RDF</rdfs:label>
+    <owl:versionInfo>20141130</owl:versionInfo>
+</owl:Ontology>
+"""
+
+entity = """<owl:Class rdf:about="http://id.who.int/icd/entity/%(entity)d" xml:lang="en" icdf:reviewed="false">
+    <rdfs:label>Synthetic disorder %(n)d</rdfs:label>
+    <rdfs:subClassOf rdf:resource="http://id.who.int/icd/entity/%(parent)d"/>
+    <icdf:Description.entity.en.MapType>0/E</icdf:Description.entity.en.MapType>
+    <icdf:Description.entity.en.Comments>%(comment)s</icdf:Description.entity.en.Comments>%(equiv)s
+</owl:Class>
+"""
+
+equivalent = """
+    <owl:equivalentClass rdf:resource="http://snomed.info/id/%d"/>"""
+
+
+def write_icd11_owl(path, nclasses):
+    """ Write an RDF/XML file with nclasses ICD-11 entities that each carry a compositional grammar expression.
+    Every third entity also has a direct equivalence to a SNOMED CT concept.
+    :param path: file to write
+    :param nclasses: number of entities
+    """
+    with open(path, 'w') as f:
+        f.write(header)
+        for n in range(nclasses):
+            comment = "Expression (post_coordinated) %d | Disorder %d |: 363698007 | Finding site | = %d | Site %d | " \
+                      % (64572001 + n, n, 71252005 + n % 997, n % 997)
+            f.write(entity % dict(entity=1000000000 + n, n=n, parent=1000000000 + n // 10,
+                                  comment=escape(comment), equiv=equivalent % (22298006 + n) if n % 3 == 0 else ''))
+        f.write("</rdf:RDF>\n")
@@ -1,4 +1,4 @@
-from distutils.core import setup
+from setuptools import setup
 
 install_requires = [
     "rdflib",
@@ -16,5 +16,14 @@ setup(
     author='Harold Solbrig',
     author_email='solbrig.harold@mayo.edu',
     description='Front end for converting Compositional Grammar in ICD11 OWL constructs',
-    requires=install_requires
+    install_requires=install_requires,
+    # The entry points parse their arguments before they import rdflib and py4j
+    entry_points={
+        'console_scripts': [
+            'cgtoowl = ICD11OWLConverter.cli:cgtoowl_main',
+            'tagadder = ICD11OWLConverter.cli:tagadder_main',
+            'isolateEquivalents = ICD11OWLConverter.cli:isolate_equivalents_main',
+            'cardio_expressions_to_owl = ICD11OWLConverter.cli:cardio_main',
+        ]
+    }
 )
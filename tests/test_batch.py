@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2014, Mayo Clinic
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+# Redistributions of source code must retain the above copyright notice, this
+# list of conditions and the following disclaimer.
+#
+#     Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#
+#     Neither the name of the <ORGANIZATION> nor the names of its contributors
+#     may be used to endorse or promote products derived from this software
+#     without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+# IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,
+# INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, 
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE
+# OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+# OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import json
+import unittest
+
+import cherrypy
+
+from benchmarks import fakegateway
+from ICD11OWLConverter.server.SCTConverter import SCTConverter, conversion_error
+from tests.utils import start_request
+
+batch_config = {'gatewaypool.minsize': 2, 'gatewaypool.maxsize': 2, 'batch.chunksize': 3, 'batch.maxrows': 5}
+
+# Rows 2 and 4 can't be converted: the gateway can't parse "nothing" and row 4 has no subject
+batch_body = json.dumps([{"subject": "who:1", "expr": "64572001| Disease |"},
+                         ["sct:2", "123| X |: 363698007 | Finding site | = 456 | Y |", True],
+                         {"subject": "3", "expr": "nothing"},
+                         ["who:4", "22298006 | Myocardial infarction |"],
+                         {"subject": "", "expr": "1|a|"}])
+
+
+class TestBatch(unittest.TestCase):
+    def setUp(self):
+        self.parser = fakegateway.install()
+        cherrypy.config.update(batch_config)
+        self.converter = SCTConverter()
+
+    def tearDown(self):
+        for k in batch_config:
+            cherrypy.config.pop(k, None)
+        fakegateway.uninstall()
+
+    def post(self, body, content_type='application/json', **params):
+        """ Invoke the /parse/batch handler
+        :return: response body, response headers
+        """
+        start_request({'Content-Type': content_type}, body)
+        rval = self.converter.batch(**params)
+        self.assertEqual(cherrypy.response.stream, not isinstance(rval, str))
+        return rval, cherrypy.response.headers
+
+    def assertStatus(self, status, body, content_type='application/json', **params):
+        with self.assertRaises(cherrypy.HTTPError) as cm:
+            self.post(body, content_type, **params)
+        self.assertEqual(status, cm.exception.status)
+
+    def test_merged(self):
+        rval, headers = self.post(batch_body, format='turtle')
+        self.assertIn('<http://id.who.int/icd/entity/1>', rval)
+        self.assertIn('<http://id.who.int/icd/entity/4>', rval)
+        self.assertEqual('2,4', headers['X-Batch-Errors'])
+
+    def test_chunksize(self):
+        # The expressions are spread across the pool, at most batch.chunksize at a time
+        self.assertEqual(1, self.converter.batch_chunksize(1))
+        self.assertEqual(2, self.converter.batch_chunksize(3))
+        self.assertEqual(3, self.converter.batch_chunksize(1000))
+
+    def test_stream_ntriples(self):
+        rval, headers = self.post(batch_body, format='nt')
+        self.assertTrue(headers['Content-Type'].startswith('text/plain'))
+        self.assertNotIn('X-Batch-Errors', headers)
+        chunks = list(rval)
+        self.assertEqual(5, len(chunks))
+        self.assertIn('<http://id.who.int/icd/entity/1>', chunks[0])
+        self.assertIn('<http://snomed.info/id/456>', chunks[1])
+        self.assertEqual('# Row 2: %s\n' % conversion_error, chunks[2])
+        self.assertIn('<http://id.who.int/icd/entity/4>', chunks[3])
+        self.assertTrue(chunks[4].startswith('# Row 4: '))
+        for chunk in chunks[:2] + chunks[3:4]:
+            self.assertTrue(all(line.endswith(' .') for line in chunk.splitlines()))
+
+    def test_stream_rows(self):
+        rval, headers = self.post('subject\texpr\tprimitive\nwho:5\t64572001|Disease|\tyes\n3\tnothing\t\n',
+                                  'text/tab-separated-values', results='rows', format='turtle')
+        self.assertTrue(headers['Content-Type'].startswith('application/json'))
+        rows = json.loads(''.join(rval))
+        self.assertEqual([0, 1], [r['row'] for r in rows])
+        self.assertEqual(['who:5', '3'], [r['subject'] for r in rows])
+        self.assertIn('rdfs:subClassOf', rows[0]['result'])
+        self.assertIsNone(rows[0]['error'])
+        self.assertIsNone(rows[1]['result'])
+        self.assertEqual(conversion_error, rows[1]['error'])
+
+    def test_errors(self):
+        self.assertStatus(415, 'x', 'text/csv')
+        self.assertStatus(400, '{"a": 1}')
+        self.assertStatus(400, '[]')
+        self.assertStatus(400, batch_body, results='x')
+        self.assertStatus(400, batch_body, format='x')
+        self.assertStatus(413, json.dumps([["who:1", "1|a|"]] * 6), format='turtle')
+        self.assertEqual(0, self.parser.calls)
+        # None of the rows could be converted
+        self.assertStatus(400, '[["1", "nothing"]]', format='turtle')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2014, Mayo Clinic
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+# Redistributions of source code must retain the above copyright notice, this
+# list of conditions and the following disclaimer.
+#
+#     Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#
+#     Neither the name of the <ORGANIZATION> nor the names of its contributors
+#     may be used to endorse or promote products derived from this software
+#     without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+# IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,
+# INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, 
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE
+# OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+# OF THE POSSIBILITY OF SUCH DAMAGE.
+import unittest
+
+from ICD11OWLConverter.server.utils.batchrows import json_rows, tsv_rows
+
+
+class TestBatchRows(unittest.TestCase):
+    def test_json(self):
+        self.assertEqual([('who:1', '64572001|Disease|', None), ('2', '123|X|', True)],
+                         json_rows('[{"subject": "who:1", "expr": "64572001|Disease|"}, [2, "123|X|", true]]'))
+        self.assertRaises(ValueError, json_rows, '{"subject": "who:1"}')
+        self.assertRaises(ValueError, json_rows, '[["who:1"]]')
+        self.assertRaises(ValueError, json_rows, '[')
+
+    def test_tsv(self):
+        self.assertEqual([('who:1', '64572001|Disease|', None), ('2', '123|X|', 'yes')],
+                         tsv_rows('who:1\t64572001|Disease|\n\n2\t123|X|\tyes\n'))
+        # A header can name the columns in any order
+        self.assertEqual([('who:1', '64572001|Disease|', 'n')],
+                         tsv_rows('primitive\tsubject\texpr\nn\twho:1\t64572001|Disease|\n'))
+        self.assertRaises(ValueError, tsv_rows, 'who:1\n')
+
+
+if __name__ == '__main__':
+    unittest.main()
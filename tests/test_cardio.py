@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2014, Mayo Clinic
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+# Redistributions of source code must retain the above copyright notice, this
+# list of conditions and the following disclaimer.
+#
+#     Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#
+#     Neither the name of the <ORGANIZATION> nor the names of its contributors
+#     may be used to endorse or promote products derived from this software
+#     without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+# IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,
+# INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, 
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE
+# OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+# OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from rdflib import Graph, BNode, URIRef, RDF, OWL
+from rdflib.compare import isomorphic
+
+from benchmarks import fakegateway
+from ICD11OWLConverter import cardio_expressions_to_owl
+from tests.utils import write_tsv
+
+map_ttl = """@prefix owl: <http://www.w3.org/2002/07/owl#> .
+<http://id.who.int/icd/entity/100> owl:equivalentClass <http://snomed.info/id/22298006> .
+"""
+
+
+class TestRenameBnodes(unittest.TestCase):
+    def test_rename_bnodes(self):
+        # Two workers forked with the same blank node generator state hand back the same identifiers
+        worker_triples = lambda subj: [(URIRef(subj), OWL.equivalentClass, BNode('f1')),
+                                       (BNode('f1'), RDF.type, OWL.Class)]
+        g = Graph()
+        g += cardio_expressions_to_owl.rename_bnodes(worker_triples('http://who.int/1'))
+        g += cardio_expressions_to_owl.rename_bnodes(worker_triples('http://who.int/2'))
+        self.assertEqual(4, len(g))
+        bnodes = set(g.objects(None, OWL.equivalentClass))
+        self.assertEqual(2, len(bnodes))
+        self.assertNotIn(BNode('f1'), bnodes)
+        self.assertEqual(bnodes, set(g.subjects(RDF.type, OWL.Class)))
+
+
+class TestJobs(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.infile = os.path.join(self.tmpdir, 'cardio.tsv')
+        self.mapfile = os.path.join(self.tmpdir, 'map.ttl')
+        write_tsv(self.infile, 23)
+        with open(self.mapfile, 'w') as f:
+            f.write(map_ttl)
+        # The worker processes are forked, so they inherit the fake gateway
+        fakegateway.install()
+
+    def tearDown(self):
+        fakegateway.uninstall()
+        shutil.rmtree(self.tmpdir)
+
+    def convert(self, name, *args):
+        outfile = os.path.join(self.tmpdir, name)
+        cardio_expressions_to_owl.main([self.infile, '-o', outfile, '-m', self.mapfile] + list(args))
+        os.rename(self.mapfile + 'upd.ttl', outfile + '.map')
+        return Graph().parse(outfile, format='n3'), Graph().parse(outfile + '.map', format='n3')
+
+    def test_jobs(self):
+        for args in ([], ['-n']):
+            g, map_g = self.convert('serial.n3', *args)
+            with mock.patch.object(cardio_expressions_to_owl, 'default_chunksize', 5):
+                jobs_g, jobs_map_g = self.convert('jobs.n3', '-j', '2', *args)
+            self.assertEqual(24, len(map_g))
+            self.assertTrue(isomorphic(g, jobs_g))
+            self.assertTrue(isomorphic(map_g, jobs_map_g))
+
+
+if __name__ == '__main__':
+    unittest.main()
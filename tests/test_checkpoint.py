@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2014, Mayo Clinic
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+# Redistributions of source code must retain the above copyright notice, this
+# list of conditions and the following disclaimer.
+#
+#     Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#
+#     Neither the name of the <ORGANIZATION> nor the names of its contributors
+#     may be used to endorse or promote products derived from this software
+#     without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+# IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,
+# INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, 
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE
+# OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+# OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from rdflib import Graph, URIRef, Literal, RDFS
+from rdflib.compare import isomorphic
+
+from benchmarks import fakegateway
+from ICD11OWLConverter.checkpoint import Checkpoint
+from ICD11OWLConverter import cardio_expressions_to_owl
+from tests.utils import write_tsv
+
+
+class Interrupted(BaseException):
+    pass
+
+
+class TestCheckpoint(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.infile = os.path.join(self.tmpdir, 'cardio.tsv')
+        self.outfile = os.path.join(self.tmpdir, 'cardio.n3')
+
+    def tearDown(self):
+        fakegateway.uninstall()
+        shutil.rmtree(self.tmpdir)
+
+    def test_truncate_and_resume(self):
+        triple = lambda n: (URIRef('http://who.int/%d' % n), RDFS.label, Literal('Label %d' % n))
+        checkpoint = Checkpoint(self.outfile, self.infile)
+        checkpoint.start()
+        checkpoint.save(10, [triple(1), triple(2)], [triple(3)])
+        checkpoint.save(5, [triple(4)])
+        # A run that is interrupted while it writes leaves a partial checkpoint behind
+        with open(checkpoint.ntpath, 'a') as f:
+            f.write('<http://who.int/5> <http://www.w3.org/2000/01/rdf-schema#label> "Lab')
+        with open(checkpoint.mappath, 'a') as f:
+            f.write('<http://who.int/6> <http://www.w3.org/2000/01/rdf-schema#label> "Label 6" .\n')
+
+        checkpoint = Checkpoint(self.outfile, self.infile)
+        self.assertTrue(checkpoint.exists())
+        g, map_g = Graph(), Graph()
+        self.assertEqual(15, checkpoint.resume(g, map_g))
+        self.assertEqual({triple(1), triple(2), triple(4)}, set(g))
+        self.assertEqual({triple(3)}, set(map_g))
+
+        self.assertRaises(ValueError, Checkpoint(self.outfile, self.outfile).resume, Graph())
+        checkpoint.remove()
+        self.assertEqual([], os.listdir(self.tmpdir))
+
+    def test_interrupted_run(self):
+        write_tsv(self.infile, 23)
+        parser = fakegateway.install()
+        cardio_expressions_to_owl.main([self.infile, '-o', self.outfile + '.full'])
+
+        # Stop the run in the middle of the third checkpoint
+        cgparsemany = parser.cgparsemany
+
+        def interrupt(*args):
+            if parser.calls == 2:
+                raise Interrupted()
+            return cgparsemany(*args)
+        parser.cgparsemany = interrupt
+        parser.calls = 0
+        self.assertRaises(Interrupted, cardio_expressions_to_owl.main, [self.infile, '-o', self.outfile,
+                                                                        '--checkpoint', '5'])
+        self.assertFalse(os.path.exists(self.outfile))
+        self.assertEqual(10, Checkpoint(self.outfile, self.infile).resume(Graph()))
+
+        parser.cgparsemany = cgparsemany
+        parser.calls = 0
+        cardio_expressions_to_owl.main([self.infile, '-o', self.outfile, '--checkpoint', '5', '--resume'])
+        self.assertEqual(3, parser.calls)
+        self.assertFalse(Checkpoint(self.outfile, self.infile).exists())
+        self.assertTrue(isomorphic(Graph().parse(self.outfile + '.full', format='n3'),
+                                   Graph().parse(self.outfile, format='n3')))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2014, Mayo Clinic
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+# Redistributions of source code must retain the above copyright notice, this
+# list of conditions and the following disclaimer.
+#
+#     Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#
+#     Neither the name of the <ORGANIZATION> nor the names of its contributors
+#     may be used to endorse or promote products derived from this software
+#     without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+# IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,
+# INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, 
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE
+# OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+# OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import time
+import unittest
+from threading import Timer
+
+from benchmarks import fakegateway
+from ConverterGateway import SCTConverterGateway, SCTConverterGatewayPool, GatewayPoolTimeout, RetryPolicy, \
+    CircuitBreaker, Py4JNetworkError
+
+expr = "64572001 | Disease |: 363698007 | Finding site | = 71252005 | Cervix |"
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def setUp(self):
+        self.parser = fakegateway.install()
+
+    def tearDown(self):
+        fakegateway.uninstall()
+
+    def test_malformed_expressions(self):
+        gw = SCTConverterGateway(retry_policy=RetryPolicy(retries=2, backoff=0), breaker=CircuitBreaker(3))
+        for _ in range(5):
+            self.assertIsNone(gw.parse('http://who.int/1', True, 'not an expression'))
+        self.assertFalse(gw.breaker.is_open)
+        self.assertEqual(0, gw.counters['retries'])
+        self.assertIn('Disease', gw.parse('http://who.int/1', True, expr))
+
+    def test_network_errors(self):
+        def unreachable(*_):
+            raise Py4JNetworkError("Connection refused")
+        gw = SCTConverterGateway(retry_policy=RetryPolicy(retries=1, backoff=0), breaker=CircuitBreaker(2, 0.05))
+        self.parser.cgparse = unreachable
+        self.assertRaises(Py4JNetworkError, gw.parse, 'http://who.int/1', True, expr)
+        self.assertFalse(gw.breaker.is_open)
+        self.assertRaises(Py4JNetworkError, gw.parse, 'http://who.int/1', True, expr)
+        self.assertTrue(gw.breaker.is_open)
+        self.assertEqual(2, gw.counters['retries'])
+        self.assertIsNone(gw.parse('http://who.int/1', True, expr))
+        self.assertEqual(1, gw.counters['rejections'])
+
+        # The probe uses a connection of its own and closes the circuit once the gateway answers
+        connection = gw._gateway
+        del self.parser.cgparse
+        time.sleep(0.2)
+        self.assertFalse(gw.breaker.is_open)
+        self.assertIs(connection, gw._gateway)
+        self.assertIn('Disease', gw.parse('http://who.int/1', True, expr))
+
+
+class TestParseMany(unittest.TestCase):
+    entries = [('http://who.int/%d' % i, i % 2 == 0, '%d | Concept %d |' % (i, i)) for i in range(25)]
+
+    def tearDown(self):
+        fakegateway.uninstall()
+
+    def test_batch(self):
+        parser = fakegateway.install()
+        gw = SCTConverterGateway()
+        results = list(gw.parse_many(self.entries, 10))
+        self.assertEqual(3, parser.calls)
+        self.assertEqual([gw.parse(*e) for e in self.entries], results)
+
+    def test_no_batch_entry_point(self):
+        parser = fakegateway.install(batch=False)
+        gw = SCTConverterGateway()
+        single = [gw.parse(*e) for e in self.entries]
+        parser.calls = 0
+        self.assertEqual(single, list(gw.parse_many(self.entries, 10)))
+        self.assertEqual(25, parser.calls)
+        # The gateway doesn't try the batch entry point again
+        parser.calls = 0
+        list(gw.parse_many(self.entries[:10], 10))
+        self.assertEqual(10, parser.calls)
+
+    def test_malformed_expression(self):
+        parser = fakegateway.install()
+        gw = SCTConverterGateway()
+        entries = self.entries[:10] + [('http://who.int/bad', True, 'no concepts')] + self.entries[10:]
+        results = list(gw.parse_many(entries, 10))
+        # The chunk with the malformed expression is parsed one expression at a time
+        self.assertEqual(1 + 1 + 10 + 1, parser.calls)
+        self.assertIsNone(results[10])
+        self.assertEqual([gw.parse(*e) for e in self.entries], results[:10] + results[11:])
+        self.assertFalse(gw.breaker.is_open)
+
+
+class TestGatewayPool(unittest.TestCase):
+    def setUp(self):
+        self.parser = fakegateway.install()
+
+    def tearDown(self):
+        fakegateway.uninstall()
+
+    def test_checkout(self):
+        pool = SCTConverterGatewayPool(size=1, maxsize=2, timeout=0.1)
+        a = pool.checkout()
+        # The pool grows to maxsize and then waits for a connection to be returned
+        b = pool.checkout()
+        self.assertIsNot(a, b)
+        start = time.time()
+        self.assertRaises(GatewayPoolTimeout, pool.checkout)
+        self.assertGreaterEqual(time.time() - start, 0.1)
+
+        # Idle connections are handed out in the order they were returned
+        pool.checkin(b)
+        pool.checkin(a)
+        self.assertIs(b, pool.checkout())
+        self.assertIs(a, pool.checkout())
+        self.assertEqual(2, len(pool._members))
+
+        # A waiting checkout gets the next connection that is returned
+        Timer(0.02, pool.checkin, [b]).start()
+        self.assertIs(b, pool.checkout())
+
+    def test_parse_many_order(self):
+        fakegateway.install(latency=0.002)
+        pool = SCTConverterGatewayPool(size=4)
+        entries = [('http://who.int/%d' % i, True, '%d | Concept %d |' % (i, i)) for i in range(250)]
+        results = list(pool.parse_many(entries, 10))
+        self.assertEqual(250, len(results))
+        for (subj, _, _), rslt in zip(entries, results):
+            self.assertIn('<%s> rdfs:subClassOf' % subj, rslt)
+        self.assertEqual(4, len(pool._members))
+        self.assertEqual(4, pool._idle.qsize())
+
+
+if __name__ == '__main__':
+    unittest.main()
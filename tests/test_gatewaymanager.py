@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2014, Mayo Clinic
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+# Redistributions of source code must retain the above copyright notice, this
+# list of conditions and the following disclaimer.
+#
+#     Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#
+#     Neither the name of the <ORGANIZATION> nor the names of its contributors
+#     may be used to endorse or promote products derived from this software
+#     without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+# IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,
+# INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, 
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE
+# OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+# OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import os
+import time
+import shutil
+import tempfile
+import unittest
+
+from benchmarks import fakegateway
+from gatewaymanager import GatewayManager, jar_version
+from tests.utils import listener_command
+
+port = 26400
+
+
+class TestGatewayManager(unittest.TestCase):
+    def setUp(self):
+        self.parser = fakegateway.install()
+        self.tmpdir = tempfile.mkdtemp()
+        self.manager = None
+
+    def tearDown(self):
+        if self.manager:
+            self.manager.close()
+        fakegateway.uninstall()
+        shutil.rmtree(self.tmpdir)
+
+    def test_parser_version(self):
+        def no_version():
+            raise fakegateway.FakeJavaError("Method version does not exist")
+        self.parser.version = no_version
+        jar = os.path.join(self.tmpdir, 'SCTConverter.jar')
+        self.manager = GatewayManager(port, command=listener_command, jar=jar)
+        # A custom command doesn't need the jar, so there may be nothing to derive the version from
+        self.assertIsNone(self.manager.parser_version())
+        with open(jar, 'wb') as f:
+            f.write(b'converter')
+        self.assertEqual(jar_version(jar), self.manager.parser_version())
+        self.assertTrue(self.manager.parser_version().startswith('jar-'))
+        self.parser.version = lambda: "2.1"
+        self.assertEqual("2.1", self.manager.parser_version())
+
+    def test_least_loaded(self):
+        self.manager = GatewayManager(port, 3, command=listener_command, maxsize=2)
+        gws = [self.manager.checkout() for _ in range(3)]
+        self.assertEqual({port: 1, port + 1: 1, port + 2: 1}, self.manager._inflight)
+        self.manager.checkin(gws[1])
+        self.assertEqual(1, self.manager._inflight[port])
+        self.assertEqual(0, self.manager._inflight[port + 1])
+        gws[1] = self.manager.checkout()
+        self.assertEqual(1, self.manager._inflight[port + 1])
+        # Processes whose circuit is open are skipped
+        self.manager._pools[0].breaker.is_open = True
+        self.manager.checkin(gws[0])
+        gws[0] = self.manager.checkout()
+        self.assertEqual(0, self.manager._inflight[port])
+        self.manager._pools[0].breaker.is_open = False
+        for gw in gws:
+            self.manager.checkin(gw)
+        self.assertEqual([0, 0, 0], list(self.manager._inflight.values()))
+
+    def test_parse_many(self):
+        self.manager = GatewayManager(port, 2, 2, command=listener_command)
+        self.assertEqual(4, self.manager.size)
+        entries = [('http://who.int/%d' % n, False, '%d | Concept %d |' % (n, n)) for n in range(50)]
+        rslts = list(self.manager.parse_many(entries, 5))
+        self.assertEqual(50, len(rslts))
+        self.assertTrue(all('Concept %d' % n in rslt for n, rslt in enumerate(rslts)))
+
+    def test_restart(self):
+        self.manager = GatewayManager(port, 2, command=listener_command, monitor_interval=0.1)
+        proc = self.manager._procs[1]
+        proc._proc.kill()
+        deadline = time.time() + 10
+        while not (proc.restarts and proc.alive()) and time.time() < deadline:
+            time.sleep(0.1)
+        self.assertEqual(1, proc.restarts)
+        self.assertTrue(proc.alive())
+        self.assertTrue(self.manager._procs[0].alive())
+        self.assertEqual(1, self.manager.counters['restarts'])
+        self.manager.close()
+        self.assertFalse(any(proc.alive() for proc in self.manager._procs))
+
+
+if __name__ == '__main__':
+    unittest.main()
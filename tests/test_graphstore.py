@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2014, Mayo Clinic
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+# Redistributions of source code must retain the above copyright notice, this
+# list of conditions and the following disclaimer.
+#
+#     Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#
+#     Neither the name of the <ORGANIZATION> nor the names of its contributors
+#     may be used to endorse or promote products derived from this software
+#     without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+# IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,
+# INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, 
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE
+# OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+# OF THE POSSIBILITY OF SUCH DAMAGE.
+import os
+import unittest
+
+from rdflib import Graph, URIRef, Literal, RDFS
+from rdflib.compare import isomorphic
+
+from ICD11OWLConverter.graphstore import GraphStore
+
+datadir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+
+
+class TestGraphStore(unittest.TestCase):
+    def test_sqlite(self):
+        infile = os.path.join(datadir, 'test1_out_s.owl')
+        expected = Graph().parse(infile, format='n3')
+        with GraphStore('sqlite') as graphs:
+            g = graphs.graph('test')
+            g.parse(infile, format='n3')
+            self.assertTrue(isomorphic(expected, g))
+
+            subj = URIRef('http://id.who.int/icd/entity/2000000001')
+            g.add((subj, RDFS.label, Literal('Label', lang='en')))
+            self.assertEqual([Literal('Label', lang='en')], list(g.objects(subj, RDFS.label)))
+            g.remove((subj, None, None))
+            self.assertEqual(len(expected), len(g))
+            self.assertEqual([], list(g.triples((URIRef('http://example.org/unknown'), None, None))))
+            path = graphs.path
+        self.assertFalse(os.path.exists(path))
+
+
+if __name__ == '__main__':
+    unittest.main()
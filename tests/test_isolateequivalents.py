@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2014, Mayo Clinic
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+# Redistributions of source code must retain the above copyright notice, this
+# list of conditions and the following disclaimer.
+#
+#     Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#
+#     Neither the name of the <ORGANIZATION> nor the names of its contributors
+#     may be used to endorse or promote products derived from this software
+#     without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+# IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,
+# INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, 
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE
+# OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+# OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from rdflib import Graph, ConjunctiveGraph, URIRef, OWL
+from rdflib.compare import isomorphic
+
+from ICD11OWLConverter import isolateEquivalents
+
+test_input = """<http://id.who.int/icd/entity/1> <http://www.w3.org/2002/07/owl#equivalentClass> <http://snomed.info/id/22298006> .
+<http://id.who.int/icd/entity/1> <http://www.w3.org/2000/01/rdf-schema#label> "Myocardial infarction"@en .
+<http://id.who.int/icd/entity/2> <http://www.w3.org/2002/07/owl#equivalentClass> _:r1 .
+_:r1 <http://www.w3.org/1999/02/22-rdf-syntax-ns#type> <http://www.w3.org/2002/07/owl#Restriction> .
+_:r1 <http://www.w3.org/2002/07/owl#onProperty> <http://snomed.info/id/363698007> .
+_:r1 <http://www.w3.org/2002/07/owl#someValuesFrom> <http://snomed.info/id/71252005> .
+<http://snomed.info/id/22298006> <http://www.w3.org/2000/01/rdf-schema#label> "Myocardial infarction" .
+<http://id.who.int/icd/entity/3> <http://www.w3.org/2002/07/owl#equivalentClass> <http://snomed.info/id/57054005> <http://example.org/graph> .
+"""
+
+
+def load(path, format):
+    """ Load the triples of a file, ignoring the graph each quad belongs to """
+    cg = ConjunctiveGraph()
+    cg.parse(path, format=format)
+    g = Graph()
+    for t in cg.triples((None, None, None)):
+        g.add(t)
+    return g
+
+
+class TestIsolateEquivalents(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.infile = os.path.join(self.tmpdir, 'icd.nq')
+        with open(self.infile, 'w') as f:
+            f.write(test_input)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_graph_and_stream(self):
+        isolateEquivalents.main([self.infile, '-f', 'nquads', '-of', 'nt'])
+        isolateEquivalents.main([self.infile, '-f', 'nquads', '--stream'])
+        for part in ('maps', 'nomaps'):
+            graph_g = load(self.infile + part + '.ttl', 'nt')
+            stream_g = load(self.infile + part + '.nquads', 'nquads')
+            self.assertTrue(isomorphic(graph_g, stream_g), part)
+
+        maps = load(self.infile + 'maps.nquads', 'nquads')
+        self.assertEqual({(URIRef('http://id.who.int/icd/entity/1'), URIRef('http://snomed.info/id/22298006')),
+                          (URIRef('http://id.who.int/icd/entity/3'), URIRef('http://snomed.info/id/57054005'))},
+                         set(maps.subject_objects(OWL.equivalentClass)))
+        nomaps = load(self.infile + 'nomaps.nquads', 'nquads')
+        self.assertEqual(6, len(nomaps))
+        self.assertEqual(['ICD  Myocardial infarction'],
+                         [str(o) for o in nomaps.objects(URIRef('http://id.who.int/icd/entity/1'))])
+        # The stream keeps the graph of each quad
+        with open(self.infile + 'maps.nquads') as f:
+            self.assertIn('<http://example.org/graph> .', f.read())
+
+
+if __name__ == '__main__':
+    unittest.main()
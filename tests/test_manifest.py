@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2014, Mayo Clinic
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+# Redistributions of source code must retain the above copyright notice, this
+# list of conditions and the following disclaimer.
+#
+#     Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#
+#     Neither the name of the <ORGANIZATION> nor the names of its contributors
+#     may be used to endorse or promote products derived from this software
+#     without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+# IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,
+# INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, 
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE
+# OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+# OF THE POSSIBILITY OF SUCH DAMAGE.
+import os
+import tempfile
+import unittest
+
+from ICD11OWLConverter.manifest import ConversionManifest
+from tests.utils import CountingGateway
+
+
+class TestConversionManifest(unittest.TestCase):
+    def setUp(self):
+        fd, self._mf = tempfile.mkstemp()
+        os.close(fd)
+        os.remove(self._mf)
+
+    def tearDown(self):
+        if os.path.exists(self._mf):
+            os.remove(self._mf)
+
+    def test_incremental(self):
+        gw = CountingGateway()
+        entries = [('s1', True, '123 |a|'), ('s2', False, '456 |b|'), ('s3', False, 'bad'), ('s4', True, '789 |c|'),
+                   ('s6', True, '10 |e|'), ('s6', True, '11 |f|')]
+        with ConversionManifest(None, '1.0', self._mf) as manifest:
+            list(manifest.parse_many(gw, entries))
+
+        # s1 is reformatted, s2 changes, s3 is still bad, s4 is deleted and s5 is new.  Both definitions of s6 are
+        # reused.
+        gw = CountingGateway()
+        entries = [('s1', True, '123|a|'), ('s2', True, '456 |b|'), ('s3', False, 'bad'), ('s5', True, '1 |d|'),
+                   ('s6', True, '11 |f|'), ('s6', True, '10 |e|')]
+        with ConversionManifest(self._mf, '1.0', self._mf) as manifest:
+            self.assertEqual(['s1 True 123 |a|', 's2 True 456 |b|', None, 's5 True 1 |d|', 's6 True 11 |f|',
+                              's6 True 10 |e|'], list(manifest.parse_many(gw, entries)))
+        self.assertEqual(['s2', 's3', 's5'], [subj for subj, _, _ in gw.parsed])
+        self.assertEqual((3, 3), (manifest.reused, manifest.reparsed))
+        self.assertEqual(['s4'], manifest.deleted())
+
+        # The manifest of the second conversion replaced the first
+        manifest = ConversionManifest(self._mf, '1.0')
+        self.assertEqual('s2 True 456 |b|', manifest.get('s2', True, '456 |b|'))
+        self.assertIsNone(manifest.get('s4', True, '789 |c|'))
+
+        # A new parser version reparses everything
+        manifest = ConversionManifest(self._mf, '1.1')
+        self.assertIsNone(manifest.get('s1', True, '123 |a|'))
+
+    def test_failed_conversion(self):
+        with ConversionManifest(None, '1.0', self._mf) as manifest:
+            list(manifest.parse_many(CountingGateway(), [('s1', True, '123 |a|')]))
+        try:
+            with ConversionManifest(self._mf, '1.0', self._mf) as manifest:
+                list(manifest.parse_many(CountingGateway(), [('s2', True, '456 |b|')]))
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        self.assertFalse(os.path.exists(self._mf + '.partial'))
+        self.assertEqual('s1 True 123 |a|', ConversionManifest(self._mf, '1.0').get('s1', True, '123 |a|'))
+
+if __name__ == '__main__':
+    unittest.main()
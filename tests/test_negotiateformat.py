@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2014, Mayo Clinic
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+# Redistributions of source code must retain the above copyright notice, this
+# list of conditions and the following disclaimer.
+#
+#     Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#
+#     Neither the name of the <ORGANIZATION> nor the names of its contributors
+#     may be used to endorse or promote products derived from this software
+#     without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+# IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,
+# INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, 
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE
+# OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+# OF THE POSSIBILITY OF SUCH DAMAGE.
+import unittest
+
+from ICD11OWLConverter.server.utils.negotiateFormat import parse_accept, negotiate_format
+
+formats = ['xml', 'n3', 'turtle', 'ttl', 'nt', 'pretty-xml', 'trix', 'nquads']
+
+
+class TestNegotiateFormat(unittest.TestCase):
+    def test_parse_accept(self):
+        self.assertEqual([('text', 'html', (('level', '1'),), 0.5), ('text', '*', (('charset', 'a,b'),), 0.2),
+                          ('application', 'rdf+xml', (), 1.0)],
+                         parse_accept('Text/HTML ;level=1; q=0.5; ext=1, text/*; charset="a,b" ;q=0.2, */x, '
+                                      'application/xml;q=2, application/rdf+xml'))
+
+    def test_negotiate(self):
+        self.assertEqual('turtle', negotiate_format(formats, {'Accept': 'text/turtle'}))
+        self.assertEqual('nquads', negotiate_format(formats, {'accept': 'text/turtle;q=0.5, application/n-quads'}))
+        # A browser gets the first of the offered formats that it accepts as xml
+        self.assertEqual('xml', negotiate_format(formats, {'Accept': 'text/html,application/xhtml+xml,'
+                                                                      'application/xml;q=0.9,*/*;q=0.8'}))
+        # q=0 means not acceptable, even when a wildcard would otherwise match
+        self.assertEqual('turtle', negotiate_format(formats, {'Accept': 'text/turtle, text/*'}))
+        self.assertEqual('xml', negotiate_format(formats, {'Accept': 'text/turtle;q=0, text/*'}))
+        self.assertEqual('html', negotiate_format(formats, {'Accept': 'text/turtle;q=0'}))
+        self.assertEqual('html', negotiate_format(formats, {}))
+
+
+if __name__ == '__main__':
+    unittest.main()
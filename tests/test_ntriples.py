@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2014, Mayo Clinic
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+# Redistributions of source code must retain the above copyright notice, this
+# list of conditions and the following disclaimer.
+#
+#     Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#
+#     Neither the name of the <ORGANIZATION> nor the names of its contributors
+#     may be used to endorse or promote products derived from this software
+#     without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+# IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,
+# INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, 
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE
+# OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+# OF THE POSSIBILITY OF SUCH DAMAGE.
+import io
+import unittest
+
+from rdflib import Graph, URIRef, BNode, Literal, RDF, RDFS
+from rdflib.compare import isomorphic
+
+from ICD11OWLConverter.ntriples import nt_line, load_ntriples, NTriplesSink
+
+
+class TestNTriples(unittest.TestCase):
+    def test_round_trip(self):
+        g = Graph()
+        b = BNode()
+        s = URIRef('http://id.who.int/icd/entity/1')
+        g.add((s, RDFS.label, Literal('Say "hi"\\there\n', lang='en-GB')))
+        g.add((s, RDFS.subClassOf, b))
+        g.add((b, RDFS.label, Literal('42', datatype=URIRef('http://www.w3.org/2001/XMLSchema#int'))))
+        target = Graph()
+        self.assertEqual(3, load_ntriples('# comment\n\n' + ''.join(nt_line(t) for t in g), target))
+        self.assertTrue(isomorphic(g, target))
+
+    def test_fragments(self):
+        target = Graph()
+        fragment = '_:a <http://example.org/p> "caf\\u00e9" <http://example.org/g> .\n'
+        load_ntriples(fragment, target)
+        load_ntriples(fragment, target)
+        # Blank nodes are local to a fragment and the graph names of quads are dropped
+        self.assertEqual(2, len(target))
+        self.assertEqual({Literal('café')}, set(target.objects()))
+
+    def test_not_ntriples(self):
+        target = Graph()
+        self.assertIsNone(load_ntriples('<http://example.org/s> <http://example.org/p> <http://example.org/o> .\n'
+                                        '@prefix owl: <http://www.w3.org/2002/07/owl#> .\n', target))
+        self.assertEqual(0, len(target))
+
+    def test_sink(self):
+        turtle = '@prefix owl: <http://www.w3.org/2002/07/owl#> .\n' \
+                 '<http://example.org/s> a owl:Class ; owl:equivalentClass [ owl:onProperty <http://example.org/p> ] .\n'
+        expected = Graph().parse(data=turtle, format='turtle')
+        expected.remove((None, RDF.type, None))
+        # The n3 parser adds the triples to a graph of its own on the sink's store
+        for fmt in ['turtle', 'n3']:
+            out = io.StringIO()
+            seen = []
+            sink = NTriplesSink(out, exclude=lambda t: t[1] == RDF.type, listener=seen.append)
+            sink.parse(data=turtle, format=fmt)
+            self.assertEqual(3, len(seen))
+            written = Graph().parse(data=out.getvalue(), format='nt')
+            self.assertEqual(2, len(written))
+            self.assertTrue(isomorphic(expected, written))
+
+
+if __name__ == '__main__':
+    unittest.main()
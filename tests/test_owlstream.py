@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2014, Mayo Clinic
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+# Redistributions of source code must retain the above copyright notice, this
+# list of conditions and the following disclaimer.
+#
+#     Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#
+#     Neither the name of the <ORGANIZATION> nor the names of its contributors
+#     may be used to endorse or promote products derived from this software
+#     without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+# IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,
+# INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, 
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE
+# OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+# OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import os
+import tempfile
+import unittest
+
+from rdflib import Graph, URIRef
+
+from ICD11OWLConverter.owlstream import iter_comments
+
+icdf_comments = URIRef("http://who.int/field/Description.entity.en.Comments")
+
+header = """<?xml version="1.0"?>
+<rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#" xmlns:icdf="http://who.int/field/"
+    xmlns:owl="http://www.w3.org/2002/07/owl#"%s>
+"""
+
+comment = "<icdf:Description.entity.en.Comments>%s</icdf:Description.entity.en.Comments>"
+
+body = """<owl:Class rdf:about="1">%s</owl:Class>
+<owl:Class rdf:ID="two">%s</owl:Class>
+<owl:Class rdf:about="three" xml:base="http://other.org/x/">%s
+    <owl:equivalentClass><owl:Class rdf:ID="four">%s</owl:Class></owl:equivalentClass>
+</owl:Class>
+<rdf:Description xml:base="sub/"><owl:sameAs><owl:Class rdf:about="five">%s</owl:Class></owl:sameAs></rdf:Description>
+</rdf:RDF>
+""" % tuple(comment % n for n in ['one', 'two', 'three', 'four', 'five'])
+
+
+class TestIterComments(unittest.TestCase):
+    def setUp(self):
+        fd, self._owlf = tempfile.mkstemp(suffix='.owl')
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self._owlf)
+
+    def write(self, text):
+        with open(self._owlf, 'w') as f:
+            f.write(text)
+
+    def assertMatchesGraph(self):
+        """ The streamed subjects have to be the ones that rdflib gives the comments when it loads the file """
+        expected = sorted((s, str(o)) for s, o in Graph().parse(self._owlf).subject_objects(icdf_comments))
+        self.assertEqual(5, len(expected))
+        self.assertEqual(expected, sorted(iter_comments(self._owlf)))
+
+    def test_subjects(self):
+        self.write(header % ' xml:base="http://who.int/base/"' + body)
+        self.assertMatchesGraph()
+
+    def test_document_base(self):
+        self.write(header % '' + body)
+        self.assertMatchesGraph()
+
+    def test_blank_node(self):
+        self.write(header % '' + '<rdf:Description rdf:nodeID="b1">%s</rdf:Description>\n</rdf:RDF>\n' %
+                   (comment % 'blank'))
+        self.assertRaises(ValueError, list, iter_comments(self._owlf))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2014, Mayo Clinic
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+# Redistributions of source code must retain the above copyright notice, this
+# list of conditions and the following disclaimer.
+#
+#     Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#
+#     Neither the name of the <ORGANIZATION> nor the names of its contributors
+#     may be used to endorse or promote products derived from this software
+#     without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+# IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,
+# INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, 
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE
+# OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+# OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import time
+import unittest
+from unittest import mock
+
+import cherrypy
+
+from benchmarks import fakegateway
+from ICD11OWLConverter.server.SCTConverter import SCTConverter
+from ICD11OWLConverter.server.BaseNode import check_etag
+from ICD11OWLConverter.server.utils.lrucache import LRUCache
+from tests.utils import start_request
+
+expr = "64572001 | Disease |: 363698007 | Finding site | = 71252005 | Cervix |"
+
+
+class TestLRUCache(unittest.TestCase):
+    def test_eviction(self):
+        cache = LRUCache(2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        self.assertEqual(1, cache.get('a'))
+        # 'b' is now the least recently used entry
+        cache.put('c', 3)
+        self.assertEqual(2, len(cache))
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(1, cache.get('a'))
+        self.assertEqual(3, cache.get('c'))
+        cache.put('a', 4)
+        cache.put('d', 5)
+        self.assertEqual(0, cache.get('c', 0))
+        self.assertEqual(4, cache.get('a'))
+
+        cache = LRUCache(0)
+        cache.put('a', 1)
+        self.assertEqual(0, len(cache))
+
+    def test_ttl(self):
+        now = time.time()
+        cache = LRUCache(10, 300)
+        with mock.patch.object(time, 'time', return_value=now):
+            cache.put('a', 1)
+        with mock.patch.object(time, 'time', return_value=now + 299):
+            self.assertEqual(1, cache.get('a'))
+        with mock.patch.object(time, 'time', return_value=now + 301):
+            self.assertIsNone(cache.get('a'))
+        self.assertEqual(0, len(cache))
+
+        cache = LRUCache(10)
+        cache.put('a', 1)
+        with mock.patch.object(time, 'time', return_value=now + 10 ** 6):
+            self.assertEqual(1, cache.get('a'))
+
+
+class TestCheckEtag(unittest.TestCase):
+    def check(self, if_none_match):
+        start_request({'If-None-Match': if_none_match} if if_none_match else {})
+        check_etag('"abc"')
+        self.assertEqual('"abc"', cherrypy.response.headers['ETag'])
+
+    def assertNotModified(self, if_none_match):
+        with self.assertRaises(cherrypy.HTTPRedirect) as cm:
+            self.check(if_none_match)
+        self.assertEqual(304, cm.exception.status)
+
+    def test_check_etag(self):
+        self.check(None)
+        self.check('"abd"')
+        self.check('W/"abd", "abcd"')
+        self.assertNotModified('"abc"')
+        self.assertNotModified('"xyz", "abc"')
+        self.assertNotModified('W/"abc"')
+        self.assertNotModified('*')
+
+
+class TestParseCache(unittest.TestCase):
+    def setUp(self):
+        self.parser = fakegateway.install()
+        self.converter = SCTConverter()
+
+    def tearDown(self):
+        fakegateway.uninstall()
+
+    def parse(self, if_none_match=None, **params):
+        start_request({'If-None-Match': if_none_match} if if_none_match else {})
+        return self.converter.default(**dict(dict(subject='who:1', expr=expr, format='turtle'), **params)), \
+            cherrypy.response.headers['ETag']
+
+    def test_key(self):
+        rval, etag = self.parse()
+        self.assertEqual(1, self.parser.calls)
+        # Whitespace in the expression doesn't change the key
+        self.assertEqual((rval, etag), self.parse(expr=' ' + expr.replace(' ', '\n  ')))
+        self.assertEqual(1, self.parser.calls)
+        for n, params in enumerate([dict(primitive='yes'), dict(shorturis='yes'), dict(removesct='yes'),
+                                    dict(format='nt'), dict(subject='who:2')], 2):
+            self.parse(**params)
+            self.assertEqual(n, self.parser.calls, params)
+            self.parse(**params)
+            self.assertEqual(n, self.parser.calls, params)
+
+    def test_not_modified(self):
+        _, etag = self.parse()
+        with self.assertRaises(cherrypy.HTTPRedirect) as cm:
+            self.parse(if_none_match=etag)
+        self.assertEqual(304, cm.exception.status)
+        self.assertEqual(1, self.parser.calls)
+        # A different representation has a different entity tag
+        rval, nt_etag = self.parse(if_none_match=etag, format='nt')
+        self.assertNotEqual(etag, nt_etag)
+        self.assertIn('<http://id.who.int/icd/entity/1>', rval)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2014, Mayo Clinic
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+# Redistributions of source code must retain the above copyright notice, this
+# list of conditions and the following disclaimer.
+#
+#     Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#
+#     Neither the name of the <ORGANIZATION> nor the names of its contributors
+#     may be used to endorse or promote products derived from this software
+#     without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+# IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,
+# INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, 
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE
+# OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+# OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import unittest
+
+from ICD11OWLConverter.prefixes import PrefixShortener, PrefixIndex
+
+
+class TestPrefixShortener(unittest.TestCase):
+    def test_shorten(self):
+        text = '@prefix who: <http://id.who.int/icd/entity/> .\n' \
+               '\n' \
+               '<http://id.who.int/icd/entity/1097772105> a owl:Class ;\n' \
+               '    owl:intersectionOf ( <http://snomed.info/id/302847003> <http://example.org/x> ) ;\n' \
+               '    icdf:x <http://who.int/field/Description.entity.en.Comments> .'
+        expected = '@prefix who: <http://id.who.int/icd/entity/> .\n' \
+                   '\n' \
+                   'who:1097772105 a owl:Class ;\n' \
+                   '    owl:intersectionOf ( sctid:302847003 <http://example.org/x> ) ;\n' \
+                   '    icdf:x icdf:Description.entity.en.Comments .'
+        self.assertEqual(expected, PrefixShortener().shorten(text))
+
+    def test_nested_namespaces(self):
+        shortener = PrefixShortener({'a': 'http://example.org/', 'b': 'http://example.org/b/'})
+        self.assertEqual('b:1 a:c/1', shortener.shorten('<http://example.org/b/1> <http://example.org/c/1>'))
+
+
+class TestPrefixIndex(unittest.TestCase):
+    def test_longest_prefix(self):
+        index = PrefixIndex({'http://example.org/': 'a', 'http://example.org/b/': 'b'})
+        self.assertEqual('b', index.lookup('http://example.org/b/1'))
+        self.assertEqual('a', index.lookup('http://example.org/c/1'))
+        self.assertIsNone(index.lookup('http://other.org/'))
+        self.assertEqual('x', PrefixIndex({}).lookup('http://example.org/', 'x'))
+
+
+if __name__ == '__main__':
+    unittest.main()
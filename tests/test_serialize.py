@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2014, Mayo Clinic
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+# Redistributions of source code must retain the above copyright notice, this
+# list of conditions and the following disclaimer.
+#
+#     Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#
+#     Neither the name of the <ORGANIZATION> nor the names of its contributors
+#     may be used to endorse or promote products derived from this software
+#     without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+# IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,
+# INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, 
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE
+# OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+# OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import os
+import unittest
+
+from rdflib import Graph
+from rdflib.compare import isomorphic
+
+from ICD11OWLConverter import cgtoowl
+
+data = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+
+
+def converted_graph():
+    """ Return the graph that cgtoowl serialized to test1_out.owl """
+    return cgtoowl.add_namespaces(Graph()).parse(os.path.join(data, 'test1_out.owl'), format='turtle')
+
+
+def body(text):
+    """ Drop the @prefix lines, which list the namespaces that were bound when the file was written """
+    return [l for l in text.splitlines() if not l.startswith('@prefix')]
+
+
+class TestSerializeGraph(unittest.TestCase):
+    def test_same_as_multi_pass(self):
+        """ The test1_out_*.owl files were written by the old serialize_graph, which serialized the graph to turtle,
+        filtered the SCT declaration lines out of the text, shortened the URIs with regular expressions and then
+        parsed and serialized the result again. """
+        for suffix, removesctid, shorturi in [('', False, False), ('_r', True, False), ('_s', False, True),
+                                              ('_rs', True, True)]:
+            with open(os.path.join(data, 'test1_out%s.owl' % suffix)) as f:
+                expected = f.read()
+            target = cgtoowl.serialize_graph(converted_graph(), removesctid=removesctid, shorturi=shorturi)
+            self.assertEqual(body(expected), body(target), 'test1_out%s.owl' % suffix)
+
+    def test_other_formats(self):
+        expected = Graph().parse(os.path.join(data, 'test1_out_r.owl'), format='turtle')
+        for fmt in ('xml', 'nt'):
+            target = Graph().parse(data=cgtoowl.serialize_graph(converted_graph(), fmt, removesctid=True), format=fmt)
+            self.assertTrue(isomorphic(expected, target), fmt)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2014, Mayo Clinic
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+# Redistributions of source code must retain the above copyright notice, this
+# list of conditions and the following disclaimer.
+#
+#     Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#
+#     Neither the name of the <ORGANIZATION> nor the names of its contributors
+#     may be used to endorse or promote products derived from this software
+#     without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+# IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,
+# INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, 
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE
+# OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+# OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+
+from rdflib import Graph
+from rdflib.compare import isomorphic
+
+from ICD11OWLConverter import tagadder
+
+label = '<http://www.w3.org/2000/01/rdf-schema#label>'
+test_input = ('<http://snomed.info/id/22298006> %(label)s "Myocardial infarction"@en .\n'
+              '<http://id.who.int/icd/entity/1> %(label)s "Say \\"hi\\" \\u00e9t\\u00e9 caf\\u00E9" .\n'
+              '<http://id.who.int/icd/entity/2> %(label)s "ICD  Already tagged" .\n'
+              '<http://example.org/x> %(label)s "Untagged" .\n'
+              '<http://snomed.info/sep/3> <http://www.w3.org/2000/01/rdf-schema#comment> "Not a label" .\n') % \
+    dict(label=label)
+
+
+def tag_stream(text):
+    out = io.StringIO()
+    tagadder.tag_ntriples(io.StringIO(text), out)
+    return out.getvalue()
+
+
+class TestTagAdder(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_stream_matches_graph(self):
+        infile = os.path.join(self.tmpdir, 'labels.nt')
+        with open(infile, 'w') as f:
+            f.write(test_input)
+        out = io.StringIO()
+        with redirect_stdout(out):
+            tagadder.main([infile, '-f', 'nt'])
+        graph_g = Graph().parse(data=out.getvalue(), format='nt')
+        stream_g = Graph().parse(data=tag_stream(test_input), format='nt')
+        self.assertTrue(isomorphic(graph_g, stream_g))
+        self.assertEqual({'SCT  Myocardial infarction', 'ICD  Say "hi" été café', 'ICD  ICD  Already tagged',
+                          'Untagged', 'Not a label'}, {str(o) for o in stream_g.objects()})
+
+    def test_quads(self):
+        triple = '<http://snomed.info/id/1234> %s "In a graph" ' % label
+        self.assertEqual('<http://snomed.info/id/1234> %s "SCT  In a graph" <http://example.org/graph> .\n' % label,
+                         tag_stream(triple + '<http://example.org/graph> .\n'))
+        # Lines that aren't labels of tagged entities pass through unchanged
+        untagged = ''.join(test_input.splitlines(True)[3:])
+        self.assertEqual(untagged, tag_stream(untagged))
+
+
+if __name__ == '__main__':
+    unittest.main()
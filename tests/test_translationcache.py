@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2014, Mayo Clinic
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+# Redistributions of source code must retain the above copyright notice, this
+# list of conditions and the following disclaimer.
+#
+#     Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#
+#     Neither the name of the <ORGANIZATION> nor the names of its contributors
+#     may be used to endorse or promote products derived from this software
+#     without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+# IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,
+# INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, 
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE
+# OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+# OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import os
+import tempfile
+import unittest
+
+from ICD11OWLConverter.translationcache import TranslationCache, normalize_expression
+from tests.utils import CountingGateway
+
+
+class TestTranslationCache(unittest.TestCase):
+    def setUp(self):
+        fd, self._dbf = tempfile.mkstemp()
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self._dbf)
+
+    def test_normalize(self):
+        self.assertEqual('302847003| Rhabdomyosarcoma |:363698007|Finding  site|',
+                         normalize_expression(' 302847003 | Rhabdomyosarcoma |:\n 363698007 |Finding  site| '))
+
+    def test_hits_and_misses(self):
+        gw = CountingGateway()
+        cache = TranslationCache(self._dbf, '1.0')
+        entries = [('s1', True, '123 |a|'), ('s2', False, 'bad'), ('s1', True, '123|a|')]
+        self.assertEqual(['s1 True 123 |a|', None, 's1 True 123|a|'], list(cache.parse_many(gw, entries)))
+        self.assertEqual((0, 3), (cache.hits, cache.misses))
+        cache.close()
+
+        cache = TranslationCache(self._dbf, '1.0')
+        self.assertEqual('s1 True 123|a|', cache.parse(gw, 's1', True, '123  |a|'))
+        self.assertIsNone(cache.parse(gw, 's2', False, 'bad'))
+        self.assertEqual((1, 1), (cache.hits, cache.misses))
+        cache.close()
+
+        # A new parser version invalidates the cache
+        cache = TranslationCache(self._dbf, '1.1')
+        self.assertIsNone(cache.get('s1', True, '123 |a|'))
+        cache.close()
+
+        # Translations can't be cached without knowing which parser produced them
+        self.assertRaises(ValueError, TranslationCache, self._dbf, None)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2014, Mayo Clinic
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+# Redistributions of source code must retain the above copyright notice, this
+# list of conditions and the following disclaimer.
+#
+#     Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+#
+#     Neither the name of the <ORGANIZATION> nor the names of its contributors
+#     may be used to endorse or promote products derived from this software
+#     without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE DISCLAIMED.
+# IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT,
+# INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, 
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE
+# OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED
+# OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import io
+import sys
+
+import cherrypy
+from cherrypy.lib.httputil import HeaderMap
+
+
+class CountingGateway(object):
+    """ Gateway stand-in that records the entries it is asked to parse.  The expression 'bad' fails to parse """
+    def __init__(self):
+        self.parsed = []
+
+    def parse_many(self, entries):
+        for subj, primitive, cgexpr in entries:
+            self.parsed.append((subj, primitive, cgexpr))
+            yield None if cgexpr == 'bad' else '%s %s %s' % (subj, primitive, cgexpr)
+
+
+tsv_header = "icd11\ticdrubric\texpression\tmaptype\n"
+tsv_row = "http://id.who.int/icd/entity/%(n)d\tCardio %(n)d\t%(sct)d | Disorder %(n)d |: 363698007 | Finding site | = " \
+          "%(site)d | Site %(n)d |\t%(maptype)s\n"
+
+
+def write_tsv(path, nrows):
+    """ Write a cardio_expressions_to_owl input file of nrows rows with distinct expressions """
+    with open(path, 'w') as f:
+        f.write(tsv_header)
+        for n in range(nrows):
+            f.write(tsv_row % dict(n=n, sct=64572001 + n, site=71252005 + n, maptype='AE'[n % 2]))
+
+
+# Stand-in for a gateway process: accepts connections on the port given as its only argument and closes them
+listener_command = [sys.executable, '-c', "import socket, sys\n"
+                                          "s = socket.socket()\n"
+                                          "s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)\n"
+                                          "s.bind(('127.0.0.1', int(sys.argv[1])))\n"
+                                          "s.listen(50)\n"
+                                          "while True:\n"
+                                          "    s.accept()[0].close()\n", '{port}']
+
+
+def start_request(headers=None, body=''):
+    """ Give the current thread a new cherrypy request and response, as the server does before it calls a handler
+    :param headers: request headers
+    :param body: request body text
+    """
+    cherrypy.serving.request = cherrypy._cprequest.Request(None, None)
+    cherrypy.serving.request.headers = HeaderMap(headers or {})
+    cherrypy.serving.request.body = io.BytesIO(body.encode('utf-8'))
+    cherrypy.serving.response = cherrypy._cprequest.Response()